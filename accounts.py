@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+from config import config
+from bybit_client import BybitClient
+from paper_trading import PaperTradingClient
+from risk import RiskEngine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNT = 'default'
+
+
+class TradingAccount:
+    """One trading profile: its own execution client, pairs and sizing.
+
+    Settings left as None fall back to the global config, so the default
+    account keeps following /setleverage and /setrisk. Without its own pairs
+    an account trades the shared feed's pairs (the dynamic universe or
+    TRADE_PAIRS).
+    """
+
+    def __init__(self, name: str, client, pairs: Optional[List[str]] = None,
+                 leverage: Optional[float] = None, risk_percentage: Optional[float] = None,
+                 stop_loss_percent: Optional[float] = None, take_profit_percent: Optional[float] = None,
+                 risk: Optional[RiskEngine] = None, feed=None):
+        self.name = name
+        self.client = client
+        self.risk = risk or RiskEngine()
+        self.feed = feed
+        self._pairs = pairs
+        self._leverage = leverage
+        self._risk_percentage = risk_percentage
+        self._stop_loss_percent = stop_loss_percent
+        self._take_profit_percent = take_profit_percent
+
+    @property
+    def pairs(self) -> List[str]:
+        if self._pairs is not None:
+            return self._pairs
+        return self.feed.pairs if hasattr(self.feed, 'pairs') else config.TRADE_PAIRS
+
+    @property
+    def leverage(self) -> float:
+        return self._leverage if self._leverage is not None else config.DEFAULT_LEVERAGE
+
+    @leverage.setter
+    def leverage(self, value: float):
+        if self._leverage is None:
+            config.DEFAULT_LEVERAGE = value
+        else:
+            self._leverage = value
+
+    @property
+    def risk_percentage(self) -> float:
+        return self._risk_percentage if self._risk_percentage is not None else config.RISK_PERCENTAGE
+
+    @risk_percentage.setter
+    def risk_percentage(self, value: float):
+        if self._risk_percentage is None:
+            config.RISK_PERCENTAGE = value
+        else:
+            self._risk_percentage = value
+
+    @property
+    def stop_loss_percent(self) -> float:
+        return self._stop_loss_percent if self._stop_loss_percent is not None else config.STOP_LOSS_PERCENT
+
+    @property
+    def take_profit_percent(self) -> float:
+        return self._take_profit_percent if self._take_profit_percent is not None else config.TAKE_PROFIT_PERCENT
+
+    @property
+    def is_paper(self) -> bool:
+        return isinstance(self.client, PaperTradingClient)
+
+    def on_market_data(self, symbol: str, market_data: Dict):
+        """Mark paper positions with klines fetched by the shared feed"""
+        if not market_data.get('list'):
+            return
+        row = market_data['list'][0]  # Bybit returns newest first
+        price = float(row[4])
+        self.risk.mark(symbol, price)
+        if self.is_paper:
+            position = self.client.positions.get(symbol)
+            if position is not None and int(row[0]) / 1000 >= position['opened_at']:
+                # The whole candle traded after entry, so its high/low may hit SL/TP
+                self.client.update_candle(symbol, float(row[2]), float(row[3]), price)
+            else:
+                self.client.update_price(symbol, price)
+
+    def sync_risk(self):
+        """Refresh the risk engine's exposure from the account's open positions"""
+        try:
+            positions = self.client.get_open_positions()
+        except Exception as e:
+            logger.error("Risk sync failed for %s: %s", self.name, e, extra={'account': self.name})
+            positions = None
+        self.risk.sync(positions)
+
+
+def _load_profiles() -> List[Dict]:
+    """Profiles from TRADING_PROFILES: inline JSON or a path to a JSON file"""
+    raw = config.TRADING_PROFILES.strip()
+    if not raw:
+        return []
+    if not raw.startswith('['):
+        with open(raw) as f:
+            raw = f.read()
+    return json.loads(raw)
+
+
+def _secret(profile: Dict, key: str) -> str:
+    # Secrets may be given inline or by naming the environment variable holding them
+    if profile.get(f"{key}_env"):
+        return os.getenv(profile[f"{key}_env"], '')
+    return profile.get(key, '')
+
+
+def _pairs(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [p.strip() for p in value.split(',') if p.strip()]
+    return list(value)
+
+
+def build_accounts(market_client, default_client=None, correlation=None, clock=None) -> Dict[str, TradingAccount]:
+    """Create the trading accounts; all paper accounts share market_client for prices"""
+    profiles = _load_profiles()
+
+    if not profiles:
+        if default_client is None:
+            # Live orders go through the HTTP client behind a shared feed, never the feed itself
+            default_client = (PaperTradingClient(market_client) if config.PAPER_TRADING
+                              else getattr(market_client, 'client', market_client))
+        return {DEFAULT_ACCOUNT: TradingAccount(DEFAULT_ACCOUNT, default_client,
+                                                risk=RiskEngine(correlation, clock=clock), feed=market_client)}
+
+    accounts = {}
+    for profile in profiles:
+        name = profile['name']
+        if name in accounts:
+            raise ValueError(f"Duplicate trading profile name: {name}")
+
+        if profile.get('paper', config.PAPER_TRADING):
+            client = PaperTradingClient(market_client, balance=profile.get('paper_balance'))
+        else:
+            client = BybitClient(_secret(profile, 'api_key'), _secret(profile, 'api_secret'))
+
+        accounts[name] = TradingAccount(
+            name, client,
+            pairs=_pairs(profile.get('pairs')),
+            leverage=profile.get('leverage'),
+            risk_percentage=profile.get('risk_percentage'),
+            stop_loss_percent=profile.get('stop_loss_percent'),
+            take_profit_percent=profile.get('take_profit_percent'),
+            risk=RiskEngine(
+                correlation,
+                max_notional=profile.get('max_notional'),
+                max_positions=profile.get('max_positions'),
+                max_correlated_notional=profile.get('max_correlated_notional'),
+                clock=clock,
+            ),
+            feed=market_client,
+        )
+        logger.info("Loaded trading profile %s (%s)", name, 'paper' if accounts[name].is_paper else 'live')
+
+    return accounts
@@ -0,0 +1,412 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# The strategy core must import with NumPy only; pandas stays available for
+# research and backtest tooling but must never be pulled in by the scan loop.
+STRATEGY_IMPORT_BUDGET_MS = 250.0
+FORBIDDEN_STRATEGY_IMPORTS = ('pandas',)
+
+DEFAULT_BASELINE_PATH = 'benchmark_baseline.json'
+DEFAULT_REGRESSION_THRESHOLD = 0.25  # 25% slower than baseline
+SWEEP_SIZES = (10, 100, 1000)
+SWEEP_MIN_VOTES = 2  # synthetic random walks almost never get three agreeing votes
+
+
+def synthetic_prices(n: int = 100, seed: int = 42, start: float = 100.0) -> List[float]:
+    """Generate a reproducible random-walk close price series"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.004, n)
+    return (start * np.cumprod(1 + returns)).tolist()
+
+
+def fixture_prices(limit: int = 100) -> List[List[float]]:
+    """Close price series taken from the (synthetic) kline fixtures"""
+    from mock_bybit import load_kline_fixtures
+
+    fixtures = load_kline_fixtures()
+    return [[float(row[4]) for row in rows[-limit:]] for rows in fixtures.values()]
+
+
+def signal_klines(n_windows: int = 12, min_votes: int = SWEEP_MIN_VOTES, window: int = 100,
+                  step: int = 7) -> Dict[str, List[List[str]]]:
+    """Synthetic kline windows on which the strategies vote BUY or SELL, so scans reach the model"""
+    from mock_bybit import generate_kline_fixtures
+    from strategies import TradingStrategies
+
+    rows = generate_kline_fixtures(['SIGNAL'], 4000)['SIGNAL']
+    closes = [float(row[4]) for row in rows]
+    saved = TradingStrategies.MIN_VOTES
+    TradingStrategies.configure({'min_votes': min_votes})
+    try:
+        klines = {}
+        for end in range(window, len(rows) + 1, step):
+            if TradingStrategies.analyze_all_strategies(closes[end - window:end])['final_signal'] != 'HOLD':
+                klines[f"SIG{len(klines):02d}USDT"] = rows[end - window:end]
+                if len(klines) == n_windows:
+                    break
+        return klines
+    finally:
+        TradingStrategies.configure({'min_votes': saved})
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarise latency samples (seconds) as microsecond percentiles"""
+    arr = np.asarray(samples) * 1e6
+    return {
+        'p50_us': float(np.percentile(arr, 50)),
+        'p90_us': float(np.percentile(arr, 90)),
+        'p99_us': float(np.percentile(arr, 99)),
+        'mean_us': float(arr.mean()),
+    }
+
+
+def time_calls(func: Callable, args_list: List, iterations: int, warmup: int = 10) -> Dict:
+    """Call func over a cycle of argument tuples and report latency and throughput"""
+    for i in range(min(warmup, iterations)):
+        func(*args_list[i % len(args_list)])
+
+    samples = []
+    for i in range(iterations):
+        args = args_list[i % len(args_list)]
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+
+    result = percentiles(samples)
+    result['calls_per_sec'] = len(samples) / sum(samples)
+    return result
+
+
+def measure_strategy_import() -> Dict:
+    """Import strategies in a fresh interpreter and report cost and loaded modules"""
+    code = (
+        "import sys, time, json\n"
+        "t = time.perf_counter()\n"
+        "import strategies\n"
+        "elapsed = (time.perf_counter() - t) * 1000\n"
+        f"print(json.dumps({{'import_ms': elapsed, "
+        f"'forbidden': [m for m in {FORBIDDEN_STRATEGY_IMPORTS!r} if m in sys.modules]}}))\n"
+    )
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['budget_ms'] = STRATEGY_IMPORT_BUDGET_MS
+    result['ok'] = not result['forbidden'] and result['import_ms'] <= STRATEGY_IMPORT_BUDGET_MS
+    return result
+
+
+def bench_analyze_all_strategies(iterations: int = 2000, n_prices: int = 100) -> Dict:
+    """Per-call latency of TradingStrategies.analyze_all_strategies"""
+    from strategies import TradingStrategies
+
+    series = [(prices,) for prices in fixture_prices(n_prices)]
+    return time_calls(TradingStrategies.analyze_all_strategies, series, iterations)
+
+
+def bench_calculate_ema(iterations: int = 5000, n_prices: int = 100) -> Dict:
+    """Per-call latency of TradingStrategies.calculate_ema (21 period)"""
+    from strategies import TradingStrategies
+
+    series = [(prices, 21) for prices in fixture_prices(n_prices)]
+    return time_calls(TradingStrategies.calculate_ema, series, iterations)
+
+
+def bench_calculate_confidence(iterations: int = 200, n_prices: int = 100) -> Dict:
+    """Per-call latency of SignalConfidenceModel.calculate_confidence"""
+    from ml_model import SignalConfidenceModel
+    from strategies import TradingStrategies
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = SignalConfidenceModel()
+        model.model_path = os.path.join(tmp, 'signal_model.pkl')
+        model.scaler_path = os.path.join(tmp, 'signal_scaler.pkl')
+        model.forest_path = os.path.join(tmp, 'signal_model.forest')
+
+        args_list = []
+        for prices in fixture_prices(n_prices):
+            results = TradingStrategies.analyze_all_strategies(prices)
+            args_list.append((prices, 'BUY', results))
+        result = time_calls(model.calculate_confidence, args_list, iterations, warmup=2)
+        # A failed scoring returns the strategy confidence, which would time the wrong path
+        result['fallbacks'] = model.fallbacks
+        result['ok'] = model.fallbacks == 0
+        return result
+
+
+def bench_ml_inference(iterations: int = 200, batch_size: int = 64, verify_rows: int = 5000) -> Dict:
+    """Scaler + forest latency via sklearn and the compact forest, with an exact-match check"""
+    from compact_forest import CompactForest, check_equivalence
+    from ml_model import SignalConfidenceModel
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = SignalConfidenceModel()
+        model.model_path = os.path.join(tmp, 'signal_model.pkl')
+        model.scaler_path = os.path.join(tmp, 'signal_scaler.pkl')
+        model.forest_path = os.path.join(tmp, 'signal_model.forest')
+        model._create_initial_model()
+
+        start = time.perf_counter()
+        forest = CompactForest.load(model.forest_path)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        rng = np.random.default_rng(0)
+        rows = rng.normal(size=(32, forest.n_features))
+        batches = [rng.normal(size=(batch_size, forest.n_features)) for _ in range(4)]
+
+        def sklearn_predict(X):
+            return model.model.predict_proba(model.scaler.transform(X))
+
+        # Includes rows far outside the training range and exactly on split thresholds
+        verify = rng.normal(size=(verify_rows, forest.n_features)) * 3
+        tree = model.model.estimators_[0].tree_
+        splits = tree.feature >= 0
+        on_threshold = np.zeros((int(splits.sum()), forest.n_features))
+        on_threshold[np.arange(len(on_threshold)), tree.feature[splits]] = tree.threshold[splits]
+        on_threshold = on_threshold * model.scaler.scale_ + model.scaler.mean_
+        max_abs_diff = max(check_equivalence(model.model, model.scaler, forest, verify),
+                           check_equivalence(model.model, model.scaler, forest, on_threshold))
+
+        batch_iterations = max(iterations // 4, 5)
+        return {
+            'sklearn': time_calls(sklearn_predict, [(row.reshape(1, -1),) for row in rows], iterations, warmup=2),
+            'compact': time_calls(forest.predict_proba, [(row.reshape(1, -1),) for row in rows], iterations),
+            f'sklearn_batch{batch_size}': time_calls(sklearn_predict, [(b,) for b in batches],
+                                                     batch_iterations, warmup=2),
+            f'compact_batch{batch_size}': time_calls(forest.predict_proba, [(b,) for b in batches],
+                                                     batch_iterations),
+            'load_ms': load_ms,
+            'model': forest.stats(),
+            'max_abs_diff': max_abs_diff,
+            'ok': max_abs_diff == 0.0,
+        }
+
+
+def bench_risk_check(iterations: int = 5000, n_positions: int = 10) -> Dict:
+    """Pre-trade risk check over fixture symbols with open positions and all limits enabled"""
+    from mock_bybit import load_kline_fixtures
+    from risk import ReturnCorrelation, RiskEngine
+
+    klines = load_kline_fixtures()
+    correlation = ReturnCorrelation()
+    for symbol, rows in klines.items():
+        correlation.update(symbol, [float(row[4]) for row in rows])
+    correlation.refresh()
+
+    symbols = sorted(klines)
+    engine = RiskEngine(correlation, max_notional=1e9, max_positions=100, max_correlated_notional=1e9)
+    for i, symbol in enumerate(symbols[:n_positions]):
+        engine.on_fill(symbol, 'Buy' if i % 2 else 'Sell', 1.0, 1000.0)
+
+    args = [(symbol, 'Buy', 0.5, 1000.0) for symbol in symbols]
+    return time_calls(engine.check, args, iterations)
+
+
+def bench_orderbook_feed(n_messages: int = 50000, n_symbols: int = 50) -> Dict:
+    """Decode + apply latency of public-stream messages across many books on one core"""
+    from mock_bybit import generate_stream_messages
+    from orderbook import MicrostructureFeed
+
+    symbols = [f"SYM{i}USDT" for i in range(n_symbols)]
+    raw = [json.dumps(m) for m in generate_stream_messages(symbols, n_messages)]
+    feed = MicrostructureFeed()
+
+    samples = []
+    for message in raw:
+        start = time.perf_counter()
+        feed.on_message(json.loads(message))
+        samples.append(time.perf_counter() - start)
+
+    result = percentiles(samples)
+    result['calls_per_sec'] = len(samples) / sum(samples)
+    result['features'] = time_calls(feed.features, [(s,) for s in symbols], len(symbols) * 20)
+    return result
+
+
+def bench_bybit_client(server_url: str, iterations: int = 300) -> Dict:
+    """Round-trip latency of BybitClient calls against the local mock server"""
+    from bybit_client import BybitClient
+
+    client = BybitClient()
+    client.base_url = server_url
+    client.api_key = client.api_key or 'bench-key'
+    client.api_secret = client.api_secret or 'bench-secret'
+
+    payload = json.dumps({'category': 'linear', 'symbol': 'BTCUSDT', 'side': 'Buy', 'orderType': 'Market',
+                          'qty': '0.01', 'timeInForce': 'GTC', 'positionIdx': 0}, separators=(',', ':'))
+    timestamp = str(client.time_sync.timestamp_ms())
+
+    return {
+        'sign_request': time_calls(client._sign, [(timestamp, payload)], iterations * 10),
+        'get_market_data': time_calls(client.get_market_data, [('BTCUSDT', '15', 100)], iterations),
+        'get_account_balance': time_calls(client.get_account_balance, [()], iterations),
+        'place_order': time_calls(client.place_order, [('BTCUSDT', 'Buy', 0.01, 99.0, 103.0)], iterations),
+    }
+
+
+def bench_scan_sweep(server_url: str, n_symbols: int, min_votes: int = SWEEP_MIN_VOTES) -> Dict:
+    """End-to-end TelegramBot.scan_pair sweep across n_symbols against the mock server.
+
+    Run against signal_klines() with the same min_votes, every scan reaches
+    the confidence model.
+    """
+    from telegram_bot import TelegramBot
+    from state_store import NullStateStore
+    from strategies import TradingStrategies
+
+    symbols = [f"SYM{i:04d}USDT" for i in range(n_symbols)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bot = TelegramBot(state_store=NullStateStore())
+        bot.market_data.client.base_url = server_url
+        bot.ml_model.model_path = os.path.join(tmp, 'signal_model.pkl')
+        bot.ml_model.scaler_path = os.path.join(tmp, 'signal_scaler.pkl')
+        bot.ml_model.forest_path = os.path.join(tmp, 'signal_model.forest')
+
+        async def sweep():
+            await bot.scan_pair(symbols[0])  # warm up model creation
+            samples = []
+            signals = 0
+            start = time.perf_counter()
+            for symbol in symbols:
+                t = time.perf_counter()
+                if await bot.scan_pair(symbol):
+                    signals += 1
+                samples.append(time.perf_counter() - t)
+            return samples, signals, time.perf_counter() - start
+
+        saved = TradingStrategies.MIN_VOTES
+        TradingStrategies.configure({'min_votes': min_votes})
+        try:
+            samples, signals, elapsed = asyncio.run(sweep())
+        finally:
+            TradingStrategies.configure({'min_votes': saved})
+        # Guard against the sweep silently measuring failed requests instead of the mock
+        missing = [s for s in symbols if not (bot.market_data.get_market_data(s, '15', 100) or {}).get('list')]
+        if missing:
+            raise RuntimeError(f"scan sweep got no mock klines for {len(missing)}/{n_symbols} symbols")
+
+    result = percentiles(samples)
+    result['symbols'] = n_symbols
+    result['strategy_signals'] = bot.metrics.counts['ml_confidence']
+    result['signals'] = signals
+    result['ml_fallbacks'] = bot.ml_model.fallbacks
+    result['ok'] = result['strategy_signals'] > n_symbols // 2 and not bot.ml_model.fallbacks
+    result['sweep_seconds'] = elapsed
+    result['symbols_per_sec'] = n_symbols / elapsed
+    return result
+
+
+def run_suite(sizes=SWEEP_SIZES, quick: bool = False) -> Dict:
+    """Run the full offline benchmark suite"""
+    from mock_bybit import MockBybitServer
+
+    scale = 0.1 if quick else 1.0
+    report = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'timestamp': int(time.time()),
+        },
+        'strategy_import': measure_strategy_import(),
+        'calculate_ema': bench_calculate_ema(int(5000 * scale)),
+        'analyze_all_strategies': bench_analyze_all_strategies(int(2000 * scale)),
+        'calculate_confidence': bench_calculate_confidence(max(int(200 * scale), 10)),
+        'ml_inference': bench_ml_inference(max(int(200 * scale), 10)),
+        'risk_check': bench_risk_check(int(5000 * scale)),
+        'orderbook_feed': bench_orderbook_feed(int(50000 * scale)),
+    }
+
+    with MockBybitServer() as server:
+        report['bybit_client'] = bench_bybit_client(server.url, max(int(300 * scale), 10))
+    with MockBybitServer(signal_klines()) as server:
+        report['scan_sweep'] = {str(n): bench_scan_sweep(server.url, n) for n in sizes}
+
+    return report
+
+
+def _latency_metrics(report: Dict, prefix: str = '') -> Dict[str, float]:
+    """Flatten a report into {metric_path: p50_us} for comparison"""
+    metrics = {}
+    for key, value in report.items():
+        if not isinstance(value, dict):
+            continue
+        path = f"{prefix}{key}"
+        if 'p50_us' in value:
+            metrics[path] = value['p50_us']
+        else:
+            metrics.update(_latency_metrics(value, f"{path}."))
+    return metrics
+
+
+def compare_to_baseline(report: Dict, baseline: Dict,
+                        threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict]:
+    """Return metrics whose median latency regressed beyond threshold"""
+    current = _latency_metrics(report)
+    previous = _latency_metrics(baseline)
+    regressions = []
+    for metric, base in previous.items():
+        if metric in current and base > 0:
+            change = (current[metric] - base) / base
+            if change > threshold:
+                regressions.append({
+                    'metric': metric,
+                    'baseline_p50_us': base,
+                    'current_p50_us': current[metric],
+                    'change': change,
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trading bot performance benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SWEEP_SIZES),
+                        help="Symbol counts for the scan sweep")
+    parser.add_argument('--quick', action='store_true', help="Run fewer iterations")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="Write results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="Allowed fractional p50 slowdown before flagging a regression")
+    parser.add_argument('--output', help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.quick)
+    checks = [report['strategy_import'], report['calculate_confidence'], report['ml_inference'],
+              *report['scan_sweep'].values()]
+    failed = not all(check['ok'] for check in checks)
+
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.threshold)
+        report['regressions'] = regressions
+        failed = failed or bool(regressions)
+
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if report.get('regressions'):
+        for r in report['regressions']:
+            print(f"REGRESSION {r['metric']}: {r['baseline_p50_us']:.1f}us -> "
+                  f"{r['current_p50_us']:.1f}us ({r['change']:+.0%})", file=sys.stderr)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,10 @@ import logging
 import sys
 import os
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('trading_bot.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from logging_setup import setup_logging
+
+# Configure logging: records are queued and written by a background listener
+setup_logging()
 logger = logging.getLogger(__name__)
 
 async def main():
@@ -19,11 +14,14 @@ async def main():
     logger.info("🚀 Starting Bybit Trading Bot on Render...")
     
     # Check environment variables
-    required_vars = ['TELEGRAM_BOT_TOKEN', 'ADMIN_CHAT_ID', 'BYBIT_API_KEY', 'BYBIT_API_SECRET']
+    required_vars = ['TELEGRAM_BOT_TOKEN', 'ADMIN_CHAT_ID']
+    if os.getenv('PAPER_TRADING', 'false').lower() != 'true':
+        # Paper trading only reads public market data
+        required_vars += ['BYBIT_API_KEY', 'BYBIT_API_SECRET']
     missing = [v for v in required_vars if not os.getenv(v)]
     
     if missing:
-        logger.error(f"❌ Missing environment variables: {missing}")
+        logger.error("❌ Missing environment variables: %s", missing)
         logger.info("Set these in Render dashboard > Environment")
         sys.exit(1)
     
@@ -1,9 +1,11 @@
 import hmac
 import hashlib
+import itertools
+import threading
 import time
 import requests
 import json
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 from urllib.parse import urlencode
 import logging
 
@@ -11,45 +13,152 @@ from config import config
 
 logger = logging.getLogger(__name__)
 
+RET_TIMESTAMP_ERROR = 10002  # request timestamp outside recv_window
+
+
+class ServerTimeSync:
+    """Estimates the offset between the local clock and Bybit server time.
+
+    Each sample takes the midpoint of a /v5/market/time round trip; the
+    offset from the fastest of the last `window` samples is used, since it
+    carries the least network asymmetry. A daemon thread resamples every
+    `interval` seconds so signed timestamps track clock drift.
+    """
+
+    def __init__(self, get_base_url: Callable[[], str], interval: Optional[float] = None, window: int = 8):
+        self.get_base_url = get_base_url
+        self.interval = config.TIME_SYNC_INTERVAL if interval is None else interval
+        self.window = window
+        self.offset_ms = 0.0
+        self.rtt_ms: Optional[float] = None
+        self.syncs = 0
+        self._samples = []  # (rtt_ms, offset_ms), newest last
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync(self, reset: bool = False) -> bool:
+        """Take one sample (discarding older ones if reset); False if the server was unreachable"""
+        try:
+            sent = time.time() * 1000
+            response = self._session.get(f"{self.get_base_url()}/v5/market/time", timeout=5)
+            received = time.time() * 1000
+            response.raise_for_status()
+            result = response.json()['result']
+            server_ms = int(result['timeNano']) / 1e6 if 'timeNano' in result else int(result['timeSecond']) * 1000
+        except Exception as e:
+            logger.warning("Server time sync failed: %s", e)
+            return False
+
+        rtt = received - sent
+        with self._lock:
+            samples = [] if reset else self._samples
+            self._samples = (samples + [(rtt, server_ms - (sent + received) / 2)])[-self.window:]
+            self.rtt_ms, self.offset_ms = min(self._samples)
+            self.syncs += 1
+        logger.debug("Server time offset %.1fms (rtt %.1fms)", self.offset_ms, self.rtt_ms)
+        return True
+
+    def timestamp_ms(self) -> int:
+        """Current server time estimate in milliseconds"""
+        return int(time.time() * 1000 + self.offset_ms)
+
+    def start(self):
+        """Sync once now, then keep resyncing in the background"""
+        if self._thread is not None:
+            return
+        self.sync()
+        self._thread = threading.Thread(target=self._run, name='bybit-time-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sync()
+
+
 class BybitClient:
-    def __init__(self):
+    def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None):
         self.base_url = "https://api-testnet.bybit.com" if config.BYBIT_TESTNET else "https://api.bybit.com"
-        self.api_key = config.BYBIT_API_KEY
-        self.api_secret = config.BYBIT_API_SECRET
+        self.api_key = config.BYBIT_API_KEY if api_key is None else api_key
+        self.api_secret = config.BYBIT_API_SECRET if api_secret is None else api_secret
+        self.recv_window = str(config.BYBIT_RECV_WINDOW)
         self.session = requests.Session()
-    
-    def _generate_signature(self, params: Dict) -> str:
-        """Generate HMAC SHA256 signature for Bybit API"""
-        param_str = urlencode(sorted(params.items()))
-        signature = hmac.new(
-            bytes(self.api_secret, 'utf-8'),
-            bytes(param_str, 'utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        return signature
-    
+        self.time_sync = ServerTimeSync(lambda: self.base_url)
+        self._request_ids = itertools.count(1)
+
+    @property
+    def api_secret(self) -> str:
+        return self._api_secret
+
+    @api_secret.setter
+    def api_secret(self, secret: str):
+        # Keyed HMAC state is built once; signing copies it instead of re-deriving the key
+        self._api_secret = secret
+        self._hmac_key = hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+    def _sign(self, timestamp: str, payload: str) -> str:
+        """V5 signature: HMAC-SHA256 of timestamp + api_key + recv_window + payload"""
+        mac = self._hmac_key.copy()
+        mac.update(f"{timestamp}{self.api_key}{self.recv_window}{payload}".encode('utf-8'))
+        return mac.hexdigest()
+
+    def _auth_headers(self, payload: str) -> Dict[str, str]:
+        timestamp = str(self.time_sync.timestamp_ms())
+        return {
+            'X-BAPI-API-KEY': self.api_key,
+            'X-BAPI-TIMESTAMP': timestamp,
+            'X-BAPI-RECV-WINDOW': self.recv_window,
+            'X-BAPI-SIGN': self._sign(timestamp, payload),
+            'X-BAPI-SIGN-TYPE': '2',
+        }
+
+    def _send(self, method: str, url: str, params: Optional[Dict], private: bool) -> Dict:
+        if method.upper() == 'GET':
+            if not private:
+                response = self.session.get(url, params=params)
+            else:
+                # Sign exactly the query string that is sent
+                query = urlencode(params or {})
+                response = self.session.get(f"{url}?{query}" if query else url, headers=self._auth_headers(query))
+        else:
+            body = json.dumps(params or {}, separators=(',', ':'))
+            headers = {'Content-Type': 'application/json'}
+            if private:
+                headers.update(self._auth_headers(body))
+            response = self.session.post(url, data=body, headers=headers)
+
+        response.raise_for_status()
+        return response.json()
+
     def _request(self, method: str, endpoint: str, params: Optional[Dict] = None, private: bool = False) -> Dict:
-        """Make authenticated request to Bybit API"""
+        """Make a request to the Bybit API, signing it with V5 headers when private"""
         url = f"{self.base_url}{endpoint}"
-        
         if private:
-            if params is None:
-                params = {}
-            params['api_key'] = self.api_key
-            params['timestamp'] = str(int(time.time() * 1000))
-            params['recv_window'] = '5000'
-            params['sign'] = self._generate_signature(params)
-        
+            self.time_sync.start()
+
+        request_id = next(self._request_ids)
+        start = time.perf_counter()
         try:
-            if method.upper() == 'GET':
-                response = self.session.get(url, params=params)
-            else:
-                response = self.session.post(url, data=params)
-            
-            response.raise_for_status()
-            return response.json()
+            result = self._send(method, url, params, private)
+            if private and result.get('retCode') == RET_TIMESTAMP_ERROR and self.time_sync.sync(reset=True):
+                # Clock jumped since the last sample; retry once with a fresh offset
+                logger.warning("Timestamp rejected for %s, resynced clock offset to %.1fms",
+                               endpoint, self.time_sync.offset_ms, extra={'endpoint': endpoint})
+                result = self._send(method, url, params, private)
+            logger.debug("%s %s -> retCode %s", method, endpoint, result.get('retCode'), extra={
+                'request_id': request_id, 'endpoint': endpoint, 'ret_code': result.get('retCode'),
+                'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+            })
+            return result
         except Exception as e:
-            logger.error(f"API request failed: {e}")
+            logger.error("API request failed: %s", e, extra={
+                'request_id': request_id, 'endpoint': endpoint, 'symbol': (params or {}).get('symbol'),
+                'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+            })
             raise
     
     def get_account_balance(self) -> float:
@@ -64,10 +173,11 @@ class BybitClient:
                 total_equity = float(response['result']['list'][0]['totalEquity'])
                 return total_equity
             else:
-                logger.error(f"Balance fetch failed: {response}")
+                logger.error("Balance fetch failed: %s", response.get('retMsg'),
+                             extra={'ret_code': response.get('retCode')})
                 return 0.0
         except Exception as e:
-            logger.error(f"Failed to get balance: {e}")
+            logger.error("Failed to get balance: %s", e)
             return 0.0
     
     def get_market_data(self, symbol: str, interval: str = '15', limit: int = 100) -> Optional[Dict]:
@@ -84,7 +194,19 @@ class BybitClient:
                 return response['result']
             return None
         except Exception as e:
-            logger.error(f"Failed to get market data for {symbol}: {e}")
+            logger.error("Failed to get market data for %s: %s", symbol, e, extra={'symbol': symbol})
+            return None
+    
+    def get_tickers(self, category: str = 'linear') -> Optional[List[Dict]]:
+        """24h ticker stats for every symbol in a category, in one call"""
+        try:
+            response = self._request('GET', '/v5/market/tickers', {'category': category})
+            
+            if response['retCode'] == 0:
+                return response['result']['list']
+            return None
+        except Exception as e:
+            logger.error("Failed to get tickers: %s", e)
             return None
     
     def set_leverage(self, symbol: str, leverage: int) -> bool:
@@ -99,7 +221,7 @@ class BybitClient:
             
             return response['retCode'] == 0
         except Exception as e:
-            logger.error(f"Failed to set leverage: {e}")
+            logger.error("Failed to set leverage: %s", e, extra={'symbol': symbol})
             return False
     
     def place_order(self, symbol: str, side: str, qty: float, 
@@ -120,7 +242,7 @@ class BybitClient:
             order_response = self._request('POST', '/v5/order/create', order_params, private=True)
             
             if order_response['retCode'] != 0:
-                logger.error(f"Order failed: {order_response}")
+                logger.error("Order failed: %s", order_response, extra={'symbol': symbol})
                 return None
             
             # Set stop loss and take profit
@@ -140,18 +262,22 @@ class BybitClient:
             
             return order_response['result']
         except Exception as e:
-            logger.error(f"Failed to place order: {e}")
+            logger.error("Failed to place order: %s", e, extra={'symbol': symbol})
             return None
     
-    def get_open_positions(self) -> Dict:
-        """Get all open positions"""
+    def get_open_positions(self) -> Optional[List[Dict]]:
+        """Get all open positions, or None if they could not be fetched"""
         try:
             response = self._request('GET', '/v5/position/list', {
                 'category': 'linear',
                 'settleCoin': 'USDT'
             }, private=True)
             
+            if response.get('retCode') != 0:
+                logger.error("Positions fetch failed: %s", response.get('retMsg'),
+                             extra={'ret_code': response.get('retCode')})
+                return None
             return response.get('result', {}).get('list', [])
         except Exception as e:
-            logger.error(f"Failed to get positions: {e}")
-            return []
+            logger.error("Failed to get positions: %s", e)
+            return None
@@ -0,0 +1,39 @@
+import asyncio
+import time
+from typing import Callable, List
+
+
+class SystemClock:
+    """Wall clock used in production"""
+
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock:
+    """Manually advanced clock for replaying recorded markets faster than real time"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self._listeners: List[Callable[[float], None]] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def add_listener(self, callback: Callable[[float], None]):
+        """Call callback(now) every time the clock advances"""
+        self._listeners.append(callback)
+
+    def advance(self, seconds: float):
+        """Move the clock forward and notify listeners"""
+        self.now += seconds
+        for callback in self._listeners:
+            callback(self.now)
+
+    async def sleep(self, seconds: float):
+        self.advance(seconds)
+        # Yield so tasks scheduled during the "sleep" (e.g. button presses) get to run
+        await asyncio.sleep(0)
@@ -0,0 +1,233 @@
+import argparse
+import json
+import logging
+import sys
+from typing import Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CFOREST1'
+ALIGNMENT = 64
+
+
+class CompactForest:
+    """A fitted StandardScaler + RandomForestClassifier as flat NumPy arrays.
+
+    All trees share one node table (`left`, `feature`, `threshold`,
+    `leaf_proba`) with siblings stored next to each other, so a split is
+    `left[node] + (x > threshold)`. Leaves point to themselves behind an
+    infinite threshold. A batch is scored by stepping every (tree, row) lane
+    at once, dropping lanes once most have reached a leaf. Inputs are scaled
+    in float64 and cast to float32 before the splits, exactly as sklearn
+    does, so probabilities match predict_proba bit for bit.
+    """
+
+    ARRAYS = ('mean', 'scale', 'roots', 'left', 'feature', 'threshold', 'leaf_proba', 'classes')
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, roots: np.ndarray, left: np.ndarray,
+                 feature: np.ndarray, threshold: np.ndarray, leaf_proba: np.ndarray,
+                 classes: np.ndarray, max_depth: int):
+        self.mean = mean
+        self.scale = scale
+        self.roots = roots
+        self.left = left
+        self.feature = feature
+        self.threshold = threshold
+        self.leaf_proba = leaf_proba
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        self.n_features = len(mean)
+
+    @staticmethod
+    def _sibling_order(tree) -> np.ndarray:
+        """New node ids in breadth-first order with each right child right after its left"""
+        order = np.empty(tree.node_count, dtype=np.int64)
+        order[0] = 0
+        queue, next_id = [0], 1
+        for node in queue:
+            left, right = tree.children_left[node], tree.children_right[node]
+            if left != -1:
+                order[left], order[right] = next_id, next_id + 1
+                next_id += 2
+                queue.extend((left, right))
+        return order
+
+    @classmethod
+    def from_sklearn(cls, model, scaler) -> 'CompactForest':
+        """Flatten a fitted forest and its scaler"""
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("only single-output forests are supported")
+
+        roots, left, feature, threshold, leaf_proba = [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            order = cls._sibling_order(tree)
+            leaf = tree.children_left == -1
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :model.n_classes_]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+
+            tree_left = np.empty(tree.node_count, dtype=np.int64)
+            tree_feature = np.empty(tree.node_count, dtype=np.int64)
+            tree_threshold = np.empty(tree.node_count, dtype=np.float64)
+            tree_proba = np.empty_like(value, dtype=np.float64)
+            tree_left[order] = np.where(leaf, order, order[tree.children_left]) + offset
+            tree_feature[order] = np.where(leaf, 0, tree.feature)
+            tree_threshold[order] = np.where(leaf, np.inf, tree.threshold)
+            tree_proba[order] = value / normalizer
+
+            roots.append(offset)
+            left.append(tree_left)
+            feature.append(tree_feature)
+            threshold.append(tree_threshold)
+            leaf_proba.append(tree_proba)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            mean=np.asarray(scaler.mean_, dtype=np.float64),
+            scale=np.asarray(scaler.scale_, dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            left=np.concatenate(left).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold),
+            leaf_proba=np.concatenate(leaf_proba),
+            classes=np.asarray(model.classes_, dtype=np.int64),
+            max_depth=max_depth,
+        )
+
+    def apply(self, scaled: np.ndarray) -> np.ndarray:
+        """Leaf node per (tree, row) lane for a scaled float32 batch, tree-major"""
+        n_rows, n_trees = scaled.shape[0], len(self.roots)
+        values = scaled.ravel()
+        base = np.tile(np.arange(n_rows) * self.n_features, n_trees)
+        leaves = np.repeat(self.roots, n_rows)
+        lanes = np.arange(len(leaves))
+        node = leaves.copy()
+
+        for _ in range(self.max_depth + 1):
+            step = self.left[node] + (values[base + self.feature[node]] > self.threshold[node])
+            moving = step != node
+            active = np.count_nonzero(moving)
+            if not active:
+                break
+            # Finished lanes keep re-reading their leaf; drop them once they are the majority
+            if active <= len(node) // 2:
+                leaves[lanes] = step
+                lanes, step, base = lanes[moving], step[moving], base[moving]
+            node = step
+        leaves[lanes] = node
+        return leaves
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for a (n_rows, n_features) batch"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features}")
+
+        scaled = ((X - self.mean) / self.scale).astype(np.float32)
+        n_trees = len(self.roots)
+        per_tree = self.leaf_proba[self.apply(scaled)].reshape(n_trees, X.shape[0], -1)
+        # Sequential sum in estimator order, as the forest accumulates it
+        return np.add.accumulate(per_tree, axis=0)[-1] / n_trees
+
+    def save(self, path: str):
+        """Write a single file: magic, JSON header, then 64-byte aligned raw arrays"""
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in self.ARRAYS}
+        header = {'max_depth': self.max_depth, 'arrays': {}}
+        offset = 0
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        encoded = json.dumps(header).encode()
+        data_start = -(-(len(MAGIC) + 4 + len(encoded)) // ALIGNMENT) * ALIGNMENT
+
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(len(encoded).to_bytes(4, 'little'))
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.seek(data_start + header['arrays'][name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'CompactForest':
+        """Open a saved forest; with mmap the arrays are paged in on first use"""
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a compact forest file")
+            length = int.from_bytes(f.read(4), 'little')
+            header = json.loads(f.read(length))
+        data_start = -(-(len(MAGIC) + 4 + length) // ALIGNMENT) * ALIGNMENT
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+            offset = data_start + spec['offset']
+            if mmap and int(np.prod(shape)) > 0:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                arrays[name] = np.fromfile(path, dtype=dtype, count=int(np.prod(shape)),
+                                           offset=offset).reshape(shape)
+        return cls(max_depth=header['max_depth'], **arrays)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'trees': len(self.roots),
+            'nodes': len(self.feature),
+            'features': self.n_features,
+            'max_depth': self.max_depth,
+            'bytes': sum(getattr(self, name).nbytes for name in self.ARRAYS),
+        }
+
+
+def export_forest(model, scaler, path: str) -> CompactForest:
+    """Flatten a fitted model/scaler pair and write it to path"""
+    forest = CompactForest.from_sklearn(model, scaler)
+    forest.save(path)
+    logger.info("🌲 Exported %d trees (%d nodes) to %s", len(forest.roots), len(forest.feature), path)
+    return forest
+
+
+def check_equivalence(model, scaler, forest: CompactForest, X: np.ndarray) -> float:
+    """Max absolute difference between sklearn and compact probabilities over X"""
+    expected = model.predict_proba(scaler.transform(X))
+    actual = forest.predict_proba(X)
+    return float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+
+
+def main():
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export the confidence model to the compact forest format")
+    parser.add_argument('--model', default='signal_model.pkl', help="Pickled RandomForestClassifier")
+    parser.add_argument('--scaler', default='signal_scaler.pkl', help="Pickled StandardScaler")
+    parser.add_argument('--output', default='signal_model.forest', help="Compact forest file to write")
+    parser.add_argument('--verify', type=int, default=10000, metavar='ROWS',
+                        help="Random rows to compare against sklearn after export (0 to skip)")
+    args = parser.parse_args()
+
+    model, scaler = joblib.load(args.model), joblib.load(args.scaler)
+    export_forest(model, scaler, args.output)
+    forest = CompactForest.load(args.output)
+    print(json.dumps(forest.stats()))
+
+    if args.verify:
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(args.verify, forest.n_features)) * scaler.scale_ + scaler.mean_
+        diff = check_equivalence(model, scaler, forest, X)
+        print(f"max |sklearn - compact| over {args.verify} rows: {diff:.3g}")
+        if diff != 0.0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ class Config:
     BYBIT_API_KEY = os.getenv('BYBIT_API_KEY', '')
     BYBIT_API_SECRET = os.getenv('BYBIT_API_SECRET', '')
     BYBIT_TESTNET = os.getenv('BYBIT_TESTNET', 'true').lower() == 'true'
+    BYBIT_RECV_WINDOW = int(os.getenv('BYBIT_RECV_WINDOW', '5000'))  # ms
+    TIME_SYNC_INTERVAL = float(os.getenv('TIME_SYNC_INTERVAL', '300'))  # seconds between server time samples
     
     # Trading Configuration
     TRADE_PAIRS = os.getenv('TRADE_PAIRS', 'BTCUSDT,ETHUSDT,BNBUSDT').split(',')
@@ -20,11 +22,66 @@ class Config:
     STOP_LOSS_PERCENT = float(os.getenv('STOP_LOSS_PERCENT', '1.5'))
     TAKE_PROFIT_PERCENT = float(os.getenv('TAKE_PROFIT_PERCENT', '3.0'))
     
+    # Paper Trading
+    PAPER_TRADING = os.getenv('PAPER_TRADING', 'false').lower() == 'true'
+    PAPER_BALANCE = float(os.getenv('PAPER_BALANCE', '10000'))
+    PAPER_FEE_RATE = float(os.getenv('PAPER_FEE_RATE', '0.055'))  # % of notional per fill
+    PAPER_SLIPPAGE = float(os.getenv('PAPER_SLIPPAGE', '0.05'))  # % against the fill
+    
+    # Portfolio risk limits (USDT notional; 0 disables a limit)
+    MAX_OPEN_POSITIONS = int(os.getenv('MAX_OPEN_POSITIONS', '10'))
+    MAX_TOTAL_NOTIONAL = float(os.getenv('MAX_TOTAL_NOTIONAL', '0'))
+    MAX_CORRELATED_NOTIONAL = float(os.getenv('MAX_CORRELATED_NOTIONAL', '0'))
+    RISK_CORRELATION_WINDOW = int(os.getenv('RISK_CORRELATION_WINDOW', '96'))  # candles of returns
+    RISK_SYNC_INTERVAL = float(os.getenv('RISK_SYNC_INTERVAL', '60'))  # seconds between position syncs
+    ALLOW_SCALE_IN = os.getenv('ALLOW_SCALE_IN', 'false').lower() == 'true'  # add to an open same-side position
+    
+    # Order-book / trade-flow features from the public WebSocket stream (needs `websockets`)
+    MICROSTRUCTURE_STREAM = os.getenv('MICROSTRUCTURE_STREAM', 'false').lower() == 'true'
+    ORDERBOOK_DEPTH = int(os.getenv('ORDERBOOK_DEPTH', '50'))  # Bybit depth topic: 1, 50, 200 or 500
+    ORDERBOOK_IMBALANCE_LEVELS = int(os.getenv('ORDERBOOK_IMBALANCE_LEVELS', '10'))
+    MICROSTRUCTURE_WINDOW = float(os.getenv('MICROSTRUCTURE_WINDOW', '60'))  # seconds
+    MICROSTRUCTURE_RECORD_PATH = os.getenv('MICROSTRUCTURE_RECORD_PATH', '')  # JSON lines of raw messages
+    
+    # Dynamic universe: scan the top N linear USDT perpetuals instead of TRADE_PAIRS (0 disables)
+    UNIVERSE_SIZE = int(os.getenv('UNIVERSE_SIZE', '0'))
+    UNIVERSE_MIN_TURNOVER = float(os.getenv('UNIVERSE_MIN_TURNOVER', '10000000'))  # 24h USDT turnover
+    UNIVERSE_REFRESH_INTERVAL = float(os.getenv('UNIVERSE_REFRESH_INTERVAL', '900'))  # seconds
+    
+    # Multi-account: JSON list of profiles, or a path to a JSON file
+    TRADING_PROFILES = os.getenv('TRADING_PROFILES', '')
+    
     # Bot Configuration
     SCAN_INTERVAL = int(os.getenv('SCAN_INTERVAL', '60'))  # seconds
+    # 'adaptive': evaluate each pair on candle close and on volatility-scaled moves instead of every sweep
+    SCAN_MODE = os.getenv('SCAN_MODE', 'fixed')
+    SCAN_POLL_INTERVAL = float(os.getenv('SCAN_POLL_INTERVAL', '10'))  # seconds between adaptive ticks
+    SCAN_CLOSE_DELAY = float(os.getenv('SCAN_CLOSE_DELAY', '2'))  # seconds after a candle boundary
+    SCAN_MOVE_SIGMA = float(os.getenv('SCAN_MOVE_SIGMA', '1.0'))  # candle return std devs
+    SCAN_MIN_MOVE = float(os.getenv('SCAN_MIN_MOVE', '0.001'))  # floor of the move threshold (0.1%)
     MIN_CONFIDENCE = float(os.getenv('MIN_CONFIDENCE', '0.7'))  # 70% confidence
+    STRATEGY_PARAMS = os.getenv('STRATEGY_PARAMS', '')  # JSON thresholds (inline or file) from optimizer.py
+    SIGNAL_TTL = int(os.getenv('SIGNAL_TTL', '900'))  # seconds an alert stays confirmable
+    MAX_PENDING_SIGNALS = int(os.getenv('MAX_PENDING_SIGNALS', '200'))
+    SIGNAL_DEDUPE_WINDOW = int(os.getenv('SIGNAL_DEDUPE_WINDOW', '300'))  # seconds
+    MAX_TRACKED_SIGNALS = int(os.getenv('MAX_TRACKED_SIGNALS', '5000'))
+    
+    # Telegram delivery
+    TELEGRAM_RATE_LIMIT = float(os.getenv('TELEGRAM_RATE_LIMIT', '1'))  # messages per second to the admin chat
+    ALERT_COALESCE_WINDOW = float(os.getenv('ALERT_COALESCE_WINDOW', '2'))  # seconds
+    ALERT_DIGEST_MAX = int(os.getenv('ALERT_DIGEST_MAX', '10'))  # alerts per digest message
+    
+    # State persistence (empty disables it)
+    STATE_DB_PATH = os.getenv('STATE_DB_PATH', 'bot_state.db')
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.getenv('LOG_FILE', 'trading_bot.log')  # JSON lines; empty disables
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # stdout: 'text' or 'json'
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', '')  # e.g. 'midnight' for time-based rotation
+    LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', '60'))  # seconds
+    LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', '3'))  # repeats allowed per window, 0 disables
 
 config = Config()
@@ -0,0 +1,106 @@
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+from clock import SystemClock
+
+
+class ExpiringStore:
+    """Size-capped mapping whose entries expire after a TTL.
+
+    Expiry is ordered by a heap of (expires_at, seq, key); replaced or removed
+    entries leave stale heap items that are skipped lazily and compacted when
+    they outnumber live ones. When full, the entry closest to expiry is evicted.
+    """
+
+    def __init__(self, ttl: float, max_size: int, clock=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock or SystemClock()
+        self._entries: Dict[Any, Tuple[float, int, Any]] = {}  # key -> (expires_at, seq, value)
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._seq = itertools.count()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def _is_live(self, item: Tuple[float, int, Any]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[1] == item[1]
+
+    def _compact(self):
+        self._heap = [item for item in self._heap if self._is_live(item)]
+        heapq.heapify(self._heap)
+
+    def set(self, key, value, ttl: Optional[float] = None) -> List[Tuple[Any, Any]]:
+        """Insert or replace key; returns entries evicted to stay within max_size"""
+        return self._insert(key, value, self.clock.time() + (self.ttl if ttl is None else ttl))
+
+    def restore(self, key, value, expires_at: float) -> List[Tuple[Any, Any]]:
+        """Insert an entry with an absolute expiry time (used when reloading persisted state)"""
+        return self._insert(key, value, expires_at)
+
+    def _insert(self, key, value, expires_at: float) -> List[Tuple[Any, Any]]:
+        seq = next(self._seq)
+        self._entries[key] = (expires_at, seq, value)
+        heapq.heappush(self._heap, (expires_at, seq, key))
+
+        evicted = []
+        while len(self._entries) > self.max_size:
+            item = heapq.heappop(self._heap)
+            if self._is_live(item):
+                evicted.append((item[2], self._entries.pop(item[2])[2]))
+                self.evictions += 1
+
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+        return evicted
+
+    def expires_at(self, key) -> Optional[float]:
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def get(self, key, default=None):
+        """Value for key, treating expired entries as missing"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock.time():
+            return default
+        return entry[2]
+
+    def pop(self, key, default=None):
+        """Remove and return a live entry"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        if entry[0] <= self.clock.time():
+            self.expirations += 1
+            return default
+        return entry[2]
+
+    def expire(self) -> List[Tuple[Any, Any]]:
+        """Remove and return all entries whose TTL has elapsed"""
+        now = self.clock.time()
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            item = heapq.heappop(self._heap)
+            if self._is_live(item):
+                expired.append((item[2], self._entries.pop(item[2])[2]))
+        self.expirations += len(expired)
+        return expired
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        now = self.clock.time()
+        return [(key, entry[2]) for key, entry in self._entries.items() if entry[0] > now]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
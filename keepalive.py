@@ -14,7 +14,7 @@ class KeepAliveHandler(BaseHTTPRequestHandler):
         
     def log_message(self, format, *args):
         # Suppress default logging
-        logger.debug(f"HTTP request: {args[0]} {args[1]}")
+        logger.debug("HTTP request: %s %s", args[0], args[1])
 
 class KeepAliveServer:
     def __init__(self, host='0.0.0.0', port=8080):
@@ -28,18 +28,18 @@ class KeepAliveServer:
         def run_server():
             try:
                 self.server = HTTPServer((self.host, self.port), KeepAliveHandler)
-                logger.info(f"🌐 Keepalive server started on {self.host}:{self.port}")
+                logger.info("🌐 Keepalive server started on %s:%s", self.host, self.port)
                 self.server.serve_forever()
             except OSError as e:
-                logger.error(f"❌ Failed to start keepalive server: {e}")
+                logger.error("❌ Failed to start keepalive server: %s", e)
                 # Try alternative port if 8080 is taken
                 try:
                     self.port = 10000
                     self.server = HTTPServer((self.host, self.port), KeepAliveHandler)
-                    logger.info(f"🌐 Keepalive server started on {self.host}:{self.port} (alternative)")
+                    logger.info("🌐 Keepalive server started on %s:%s (alternative)", self.host, self.port)
                     self.server.serve_forever()
                 except Exception as e2:
-                    logger.error(f"❌ Alternative port also failed: {e2}")
+                    logger.error("❌ Alternative port also failed: %s", e2)
         
         self.thread = threading.Thread(target=run_server, daemon=True)
         self.thread.start()
@@ -0,0 +1,125 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+from config import config
+
+# Record attributes promoted to top-level JSON fields when passed via `extra`
+STRUCTURED_FIELDS = ('symbol', 'account', 'request_id', 'latency_ms', 'endpoint', 'ret_code', 'suppressed')
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the structured fields lifted out of `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Rate-limit repetitive warnings/errors per (logger, message template, symbol).
+
+    The first `burst` records of a key pass in each `window` seconds; the
+    rest are dropped and counted, and the next record that passes carries
+    the count as `suppressed`. Runs before enqueueing, so dropped records
+    cost almost nothing.
+    """
+
+    def __init__(self, window: float = 60.0, burst: int = 3, max_keys: int = 10000):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_keys = max_keys
+        self._state: Dict[Tuple, list] = {}  # key -> [window_start, passed, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+
+        key = (record.name, record.msg if isinstance(record.msg, str) else repr(record.msg),
+               getattr(record, 'symbol', None))
+        now = time.monotonic()
+        state = self._state.get(key)
+
+        if state is None or now - state[0] >= self.window:
+            suppressed = state[2] if state else 0
+            if len(self._state) >= self.max_keys:
+                self._state.clear()
+            self._state[key] = [now, 1, 0]
+            if suppressed:
+                record.suppressed = suppressed
+            return True
+
+        if state[1] < self.burst:
+            state[1] += 1
+            return True
+
+        state[2] += 1
+        return False
+
+
+def _file_handler() -> logging.Handler:
+    if config.LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            config.LOG_FILE, when=config.LOG_ROTATE_WHEN, backupCount=config.LOG_BACKUP_COUNT
+        )
+    return logging.handlers.RotatingFileHandler(
+        config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT
+    )
+
+
+def setup_logging(level: Optional[str] = None) -> logging.handlers.QueueListener:
+    """Route all logging through a queue; a background listener does the I/O.
+
+    The event loop only formats and enqueues records; rotation, disk writes
+    and stdout happen on the listener thread.
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        JsonFormatter() if config.LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT)
+    )
+    handlers = [stream_handler]
+
+    if config.LOG_FILE:
+        file_handler = _file_handler()
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(config.LOG_SAMPLE_WINDOW, config.LOG_SAMPLE_BURST))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level or config.LOG_LEVEL)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    """Flush queued records on exit; safe if the listener was already stopped"""
+    if listener._thread is not None:
+        listener.stop()
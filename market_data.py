@@ -0,0 +1,81 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+from strategies import TradingStrategies
+from clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+
+def kline_fingerprint(rows) -> tuple:
+    """Cheap identity of a kline window: changes when a candle opens, closes or updates"""
+    return (len(rows), rows[0][0], rows[0][4], rows[-1][0]) if rows else (0,)
+
+
+class SharedMarketData:
+    """Single kline feed and indicator cache shared by every trading account.
+
+    Klines are cached per (symbol, interval, limit) for `ttl` seconds and
+    strategy results per symbol until its newest candle changes, so adding
+    accounts does not add market-data requests or indicator work.
+    """
+
+    def __init__(self, client, ttl: float = 5.0, clock=None):
+        self.client = client
+        self.ttl = ttl
+        self.clock = clock or SystemClock()
+        self._klines: Dict[Tuple[str, str, int], Tuple[float, Optional[Dict]]] = {}
+        self._analysis: Dict[str, Tuple[tuple, Dict]] = {}
+        self.symbols: Optional[List[str]] = None  # active dynamic universe, if one is selected
+        self.hits = 0
+        self.misses = 0
+        self.analysis_hits = 0
+
+    @property
+    def pairs(self) -> List[str]:
+        """Pairs for accounts without their own list: the active universe, else TRADE_PAIRS"""
+        return self.symbols if self.symbols is not None else config.TRADE_PAIRS
+
+    def get_market_data(self, symbol: str, interval: str = '15', limit: int = 100) -> Optional[Dict]:
+        key = (symbol, interval, limit)
+        now = self.clock.time()
+        cached = self._klines.get(key)
+        if cached is not None and now - cached[0] < self.ttl:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        market_data = self.client.get_market_data(symbol, interval, limit)
+        self._klines[key] = (now, market_data)
+        return market_data
+
+    def analyze(self, symbol: str, market_data: Dict, prices, microstructure: Optional[Dict] = None) -> Dict:
+        """Strategy results for symbol, reused while its newest candle is unchanged"""
+        if microstructure is not None:
+            # Book/trade features move between candles, so these results are never reused
+            return TradingStrategies.analyze_all_strategies(prices, microstructure)
+        
+        fingerprint = kline_fingerprint(market_data['list'])
+        cached = self._analysis.get(symbol)
+        if cached is not None and cached[0] == fingerprint:
+            self.analysis_hits += 1
+            return cached[1]
+
+        results = TradingStrategies.analyze_all_strategies(prices)
+        self._analysis[symbol] = (fingerprint, results)
+        return results
+
+    def forget(self, symbol: str):
+        """Drop cached klines and indicator state for a symbol"""
+        self._analysis.pop(symbol, None)
+        for key in [k for k in self._klines if k[0] == symbol]:
+            del self._klines[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'kline_hits': self.hits,
+            'kline_misses': self.misses,
+            'analysis_hits': self.analysis_hits,
+            'symbols_cached': len(self._analysis),
+        }
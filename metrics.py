@@ -0,0 +1,59 @@
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict
+import time
+
+import numpy as np
+
+
+class LatencyRecorder:
+    """Rolling latency samples per named stage (scan, fetch, alert, trade, ...)"""
+
+    def __init__(self, max_samples: int = 2000):
+        self.max_samples = max_samples
+        self.samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self.counts = defaultdict(int)
+
+    def record(self, name: str, seconds: float):
+        """Record one latency sample in seconds"""
+        self.samples[name].append(seconds)
+        self.counts[name] += 1
+
+    @contextmanager
+    def measure(self, name: str):
+        """Context manager recording the wall time of the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Percentiles in milliseconds over the retained samples of each stage"""
+        result = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            arr = np.fromiter(samples, dtype=float) * 1000
+            result[name] = {
+                'count': self.counts[name],
+                'p50_ms': float(np.percentile(arr, 50)),
+                'p90_ms': float(np.percentile(arr, 90)),
+                'p99_ms': float(np.percentile(arr, 99)),
+                'max_ms': float(arr.max()),
+            }
+        return result
+
+    def format_summary(self) -> str:
+        """Human-readable summary for Telegram and logs"""
+        lines = []
+        for name, s in sorted(self.summary().items()):
+            lines.append(
+                f"{name}: p50 {s['p50_ms']:.1f}ms, p99 {s['p99_ms']:.1f}ms (n={s['count']})"
+            )
+        return "\n".join(lines) if lines else "No samples yet"
+
+    def reset(self):
+        """Drop all samples"""
+        self.samples.clear()
+        self.counts.clear()
@@ -1,23 +1,30 @@
 import numpy as np
-import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
-from typing import Dict, Tuple, List  # ✅ CORRECT IMPORT
+from typing import Dict, Tuple, List, Optional  # ✅ CORRECT IMPORT
 import logging
 
+from compact_forest import CompactForest, export_forest
+
 logger = logging.getLogger(__name__)
 
+N_FEATURES = 5  # mean, std, 10-period return, volatility, RSI
+
 class SignalConfidenceModel:
     def __init__(self):
         self.model = RandomForestClassifier(n_estimators=100, random_state=42)
         self.scaler = StandardScaler()
         self.model_path = 'signal_model.pkl'
         self.scaler_path = 'signal_scaler.pkl'
+        self.forest_path = 'signal_model.forest'
+        self.forest: Optional[CompactForest] = None
+        self.fallbacks = 0  # calls that returned the strategy confidence because scoring failed
         
     def extract_features(self, prices: List[float], indicators: Dict) -> np.ndarray:
-        """Extract features for ML model"""
+        """Extract features for ML model: the N_FEATURES columns the model is trained on"""
+        prices = np.asarray(prices, dtype=float)
         features = []
         
         # Price-based features
@@ -27,15 +34,11 @@ class SignalConfidenceModel:
         features.append((prices[-1] - prices[-10]) / prices[-10])  # 10-period return
         
         # Volatility features
-        returns = np.diff(prices[-20:]) / prices[-21:-1]
+        returns = np.diff(prices[-21:]) / prices[-21:-1]
         features.append(np.std(returns))
         
-        # Indicator-based features
-        if 'rsi' in indicators:
-            features.append(indicators['rsi'])
-        
-        if 'ema_diff' in indicators:
-            features.append(indicators['ema_diff'])
+        # Indicator-based features; neutral RSI when there is too little history
+        features.append(indicators.get('rsi', 50.0))
         
         return np.array(features).reshape(1, -1)
     
@@ -56,32 +59,14 @@ class SignalConfidenceModel:
                     rs = np.mean(up) / np.mean(down) if len(up) > 0 else 0
                     rsi = 100 - (100 / (1 + rs))
                     indicators['rsi'] = rsi
-            
-            # Calculate EMA difference
-            # You need to import TradingStrategies if used here
-            from strategies import TradingStrategies
-            if len(prices) >= 22:
-                ema_9 = TradingStrategies.calculate_ema(prices, 9)[-1]
-                ema_21 = TradingStrategies.calculate_ema(prices, 21)[-1]
-                if not np.isnan(ema_9) and not np.isnan(ema_21):
-                    indicators['ema_diff'] = (ema_9 - ema_21) / ema_21
+                else:
+                    indicators['rsi'] = 100.0
             
             # Extract features
             features = self.extract_features(prices, indicators)
             
-            # Load or create model
-            if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-            else:
-                # Create synthetic training data for initial model
-                self._create_initial_model()
-            
-            # Scale features
-            features_scaled = self.scaler.transform(features)
-            
-            # Get prediction probabilities
-            probabilities = self.model.predict_proba(features_scaled)[0]
+            # Scaler + forest in one NumPy pass over the compact arrays
+            probabilities = self.load_forest().predict_proba(features)[0]
             
             # Map signal to class
             signal_map = {'BUY': 0, 'SELL': 1, 'HOLD': 2}
@@ -97,16 +82,34 @@ class SignalConfidenceModel:
             return min(max(final_confidence, 0), 1)
             
         except Exception as e:
-            logger.error(f"ML confidence calculation failed: {e}")
+            logger.error("ML confidence calculation failed: %s", e)
+            self.fallbacks += 1
             return strategy_results.get('confidence', 0.5)
     
+    def load_forest(self) -> CompactForest:
+        """Compact inference model, loaded once and re-exported when the pickles are newer"""
+        if self.forest is not None:
+            return self.forest
+        
+        if not os.path.exists(self.model_path):
+            # Create synthetic training data for initial model
+            self._create_initial_model()
+        elif (os.path.exists(self.forest_path)
+              and os.path.getmtime(self.forest_path) >= os.path.getmtime(self.model_path)):
+            self.forest = CompactForest.load(self.forest_path)
+        else:
+            self.model = joblib.load(self.model_path)
+            self.scaler = joblib.load(self.scaler_path)
+            self.forest = export_forest(self.model, self.scaler, self.forest_path)
+        return self.forest
+    
     def _create_initial_model(self):
         """Create initial ML model with synthetic data"""
         np.random.seed(42)
         n_samples = 1000
         
         # Create synthetic features
-        X = np.random.randn(n_samples, 5)
+        X = np.random.randn(n_samples, N_FEATURES)
         y = np.random.choice([0, 1, 2], size=n_samples, p=[0.3, 0.3, 0.4])
         
         # Scale features
@@ -118,6 +121,7 @@ class SignalConfidenceModel:
         # Save model
         joblib.dump(self.model, self.model_path)
         joblib.dump(self.scaler, self.scaler_path)
+        self.forest = export_forest(self.model, self.scaler, self.forest_path)
         
         logger.info("Initial ML model created and saved")
     
@@ -131,7 +135,7 @@ class SignalConfidenceModel:
             label = 1 if actual_success else 0
             
             # Partial fit (if supported) or retrain periodically
-            logger.info(f"Model update queued - Success: {actual_success}")
+            logger.info("Model update queued - Success: %s", actual_success)
             
         except Exception as e:
-            logger.error(f"Model update failed: {e}")
+            logger.error("Model update failed: %s", e)
@@ -0,0 +1,292 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Optional
+import threading
+import logging
+import json
+import time
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'klines_15m.json')
+
+
+def load_kline_fixtures(path: str = DEFAULT_FIXTURE_PATH) -> Dict[str, List[List[str]]]:
+    """Load kline fixtures as {symbol: rows}, rows oldest first in Bybit's string format.
+
+    The bundled fixtures/klines_15m.json is synthetic (generate_kline_fixtures);
+    record_kline_fixtures() replaces it with real candles where the API is reachable.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def generate_kline_fixtures(symbols: List[str], n_candles: int = 200, interval_minutes: int = 15,
+                            seed: int = 7) -> Dict[str, List[List[str]]]:
+    """Generate deterministic random-walk klines in Bybit's row format"""
+    rng = np.random.default_rng(seed)
+    step_ms = interval_minutes * 60 * 1000
+    start_ms = 1_700_000_000_000 - (1_700_000_000_000 % step_ms)
+    fixtures = {}
+    for symbol in symbols:
+        price = float(rng.uniform(0.5, 50000))
+        vol = float(rng.uniform(0.002, 0.01))
+        rows = []
+        for i in range(n_candles):
+            open_ = price
+            close = open_ * (1 + rng.normal(0, vol))
+            high = max(open_, close) * (1 + abs(rng.normal(0, vol / 2)))
+            low = min(open_, close) * (1 - abs(rng.normal(0, vol / 2)))
+            volume = float(rng.uniform(100, 10000))
+            rows.append([
+                str(start_ms + i * step_ms), f"{open_:.6g}", f"{high:.6g}", f"{low:.6g}",
+                f"{close:.6g}", f"{volume:.2f}", f"{volume * close:.2f}"
+            ])
+            price = close
+        fixtures[symbol] = rows
+    return fixtures
+
+
+def record_kline_fixtures(symbols: List[str], path: str = DEFAULT_FIXTURE_PATH,
+                          interval: str = '15', limit: int = 200):
+    """Record live klines from Bybit into a fixture file (requires network access)"""
+    from bybit_client import BybitClient
+
+    client = BybitClient()
+    fixtures = {}
+    for symbol in symbols:
+        market_data = client.get_market_data(symbol, interval, limit)
+        if market_data and 'list' in market_data:
+            # Bybit returns newest first; fixtures are stored oldest first
+            fixtures[symbol] = list(reversed(market_data['list']))
+    with open(path, 'w') as f:
+        json.dump(fixtures, f)
+    logger.info("Recorded %d kline fixtures to %s", len(fixtures), path)
+
+
+def ticker_from_klines(symbol: str, rows: List[List[str]], window: int = 96) -> Dict[str, str]:
+    """/v5/market/tickers entry derived from the last `window` candles (oldest first)"""
+    recent = rows[-window:]
+    last = float(recent[-1][4])
+    # Deterministic spread of 1-10 bps per symbol
+    half_spread = last * (1 + sum(symbol.encode()) % 10) / 20000
+    return {
+        'symbol': symbol,
+        'lastPrice': f"{last:.6g}",
+        'highPrice24h': f"{max(float(r[2]) for r in recent):.6g}",
+        'lowPrice24h': f"{min(float(r[3]) for r in recent):.6g}",
+        'turnover24h': f"{sum(float(r[6]) for r in recent):.2f}",
+        'volume24h': f"{sum(float(r[5]) for r in recent):.2f}",
+        'bid1Price': f"{last - half_spread:.6g}",
+        'ask1Price': f"{last + half_spread:.6g}",
+    }
+
+
+def generate_stream_messages(symbols: List[str], n_messages: int, depth: int = 50, trade_ratio: float = 0.2,
+                             seed: int = 7, start_ts: int = 1_700_000_000_000) -> List[Dict]:
+    """Deterministic Bybit public-stream messages: one orderbook snapshot per symbol,
+    then interleaved orderbook deltas and publicTrade batches"""
+    rng = np.random.default_rng(seed)
+    books = {}
+    messages = []
+    ts = start_ts
+
+    def level(price: float, size: float) -> List[str]:
+        return [f"{price:.6f}", f"{size:.3f}"]
+
+    for i, symbol in enumerate(symbols):
+        mid = 100.0 * (i + 1)
+        tick = mid * 1e-4
+        bids = {round(mid - tick * (k + 1), 6): float(rng.uniform(0.1, 5)) for k in range(depth)}
+        asks = {round(mid + tick * (k + 1), 6): float(rng.uniform(0.1, 5)) for k in range(depth)}
+        books[symbol] = {'mid': mid, 'tick': tick, 'b': bids, 'a': asks, 'u': 1}
+        messages.append({
+            'topic': f"orderbook.{depth}.{symbol}", 'type': 'snapshot', 'ts': ts,
+            'data': {'s': symbol, 'b': [level(p, q) for p, q in sorted(bids.items(), reverse=True)],
+                     'a': [level(p, q) for p, q in sorted(asks.items())], 'u': 1, 'seq': 1},
+        })
+
+    for _ in range(n_messages):
+        ts += int(rng.integers(1, 5))
+        symbol = symbols[int(rng.integers(len(symbols)))]
+        book = books[symbol]
+
+        if rng.random() < trade_ratio:
+            side = 'Buy' if rng.random() < 0.5 else 'Sell'
+            price = min(book['a']) if side == 'Buy' else max(book['b'])
+            messages.append({
+                'topic': f"publicTrade.{symbol}", 'type': 'snapshot', 'ts': ts,
+                'data': [{'T': ts, 's': symbol, 'S': side, 'v': f"{rng.uniform(0.001, 2):.3f}",
+                          'p': f"{price:.6f}", 'L': 'ZeroPlusTick', 'i': str(len(messages)), 'BT': False}],
+            })
+            continue
+
+        # Resize a few levels, or move one level to a new price within the band
+        side = 'b' if rng.random() < 0.5 else 'a'
+        levels = book[side]
+        changes = []
+        for _ in range(int(rng.integers(1, 4))):
+            price = list(levels)[int(rng.integers(len(levels)))]
+            if rng.random() < 0.7:
+                levels[price] = float(rng.uniform(0.1, 5))
+                changes.append(level(price, levels[price]))
+            else:
+                offset = int(rng.integers(1, depth + 1)) * book['tick']
+                new_price = round(book['mid'] - offset if side == 'b' else book['mid'] + offset, 6)
+                if new_price in levels:
+                    continue
+                del levels[price]
+                levels[new_price] = float(rng.uniform(0.1, 5))
+                changes.extend([level(price, 0), level(new_price, levels[new_price])])
+
+        book['u'] += 1
+        messages.append({
+            'topic': f"orderbook.{depth}.{symbol}", 'type': 'delta', 'ts': ts,
+            'data': {'s': symbol, side: changes, 'b' if side == 'a' else 'a': [], 'u': book['u'], 'seq': book['u']},
+        })
+
+    return messages
+
+
+class MockBybitState:
+    """In-memory state served by the mock Bybit HTTP server"""
+
+    def __init__(self, klines: Dict[str, List[List[str]]], balance: float = 10000.0):
+        self.klines = klines
+        self.fixture_symbols = sorted(klines)
+        self.balance = balance
+        self.orders: List[Dict] = []
+        self.leverage: Dict[str, str] = {}
+        self.clock_skew_ms = 0.0  # server clock minus local clock
+        self.lock = threading.Lock()
+
+    def server_time_ms(self) -> float:
+        return time.time() * 1000 + self.clock_skew_ms
+
+    def klines_for(self, symbol: str) -> List[List[str]]:
+        """Fixture rows for a symbol; unknown symbols reuse a fixture deterministically"""
+        if symbol in self.klines:
+            return self.klines[symbol]
+        index = sum(symbol.encode()) % len(self.fixture_symbols)
+        return self.klines[self.fixture_symbols[index]]
+
+
+class MockBybitHandler(BaseHTTPRequestHandler):
+    state: MockBybitState = None
+
+    def _send_json(self, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _ok(self, result: Dict):
+        self._send_json({'retCode': 0, 'retMsg': 'OK', 'result': result, 'time': int(self.state.server_time_ms())})
+
+    def _timestamp_rejected(self) -> bool:
+        """Apply Bybit's recv_window check to signed requests"""
+        timestamp = self.headers.get('X-BAPI-TIMESTAMP')
+        if timestamp is None:
+            return False
+        recv_window = int(self.headers.get('X-BAPI-RECV-WINDOW') or 5000)
+        server_ms = self.state.server_time_ms()
+        if server_ms - recv_window <= int(timestamp) < server_ms + 1000:
+            return False
+        self._send_json({'retCode': 10002, 'retMsg': 'invalid request, please check your server timestamp',
+                         'result': {}, 'time': int(server_ms)})
+        return True
+
+    def _params(self) -> Dict[str, str]:
+        parsed = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            raw = self.rfile.read(length).decode()
+            if raw.lstrip().startswith('{'):
+                params.update(json.loads(raw))
+            else:
+                params.update({k: v[-1] for k, v in parse_qs(raw).items()})
+        return params
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        path = urlparse(self.path).path
+        params = self._params()
+        state = self.state
+
+        if self._timestamp_rejected():
+            return
+
+        if path == '/v5/market/kline':
+            limit = int(params.get('limit', 200))
+            rows = state.klines_for(params.get('symbol', ''))[-limit:]
+            self._ok({'symbol': params.get('symbol'), 'category': 'linear', 'list': rows[::-1]})
+        elif path == '/v5/market/tickers':
+            self._ok({'category': 'linear',
+                      'list': [ticker_from_klines(s, rows) for s, rows in state.klines.items()]})
+        elif path == '/v5/market/time':
+            now = state.server_time_ms() / 1000
+            self._ok({'timeSecond': str(int(now)), 'timeNano': str(int(now * 1e9))})
+        elif path == '/v5/account/wallet-balance':
+            self._ok({'list': [{'totalEquity': str(state.balance)}]})
+        elif path == '/v5/position/set-leverage':
+            with state.lock:
+                state.leverage[params.get('symbol')] = params.get('buyLeverage')
+            self._ok({})
+        elif path == '/v5/order/create':
+            with state.lock:
+                order_id = f"mock-{len(state.orders) + 1}"
+                state.orders.append(dict(params, orderId=order_id))
+            self._ok({'orderId': order_id, 'orderLinkId': ''})
+        elif path == '/v5/position/list':
+            self._ok({'list': []})
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        # Suppress default logging
+        pass
+
+
+class MockBybitServer:
+    """Local Bybit V5 REST stand-in backed by kline fixtures, for offline benchmarks"""
+
+    def __init__(self, klines: Optional[Dict[str, List[List[str]]]] = None, host: str = '127.0.0.1', port: int = 0):
+        self.state = MockBybitState(klines if klines is not None else load_kline_fixtures())
+        handler = type('BoundMockBybitHandler', (MockBybitHandler,), {'state': self.state})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving in a background thread"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,607 @@
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import config
+from strategies import TradingStrategies
+
+logger = logging.getLogger(__name__)
+
+# Candidate values per strategy parameter (names match TradingStrategies.configure)
+PARAM_SPACE: Dict[str, List] = {
+    'rsi_oversold': [20.0, 25.0, 30.0, 35.0],
+    'rsi_overbought': [65.0, 70.0, 75.0, 80.0],
+    'ema_fast': [5, 9, 12],
+    'ema_slow': [21, 26, 34],
+    'trend_fast': [10, 20],
+    'trend_slow': [40, 50, 60],
+    'breakout_band': [0.01, 0.02, 0.03],
+    'bollinger_k': [1.5, 2.0, 2.5],
+    'min_votes': [2, 3],
+    'min_confidence': [0.5, 0.6, 0.7],
+}
+
+SCAN_WINDOW = 100  # closes scan_pair fetches; live indicators only ever see these
+RSI_PERIOD = 14
+BREAKOUT_LOOKBACK = 20  # last 20 closes; the range is taken over the first 15
+BOLLINGER_WINDOW = 20
+SLOPE_WINDOW = 10
+
+
+def default_params() -> Dict:
+    """The thresholds currently used live"""
+    params = {name: getattr(TradingStrategies, name.upper()) for name in PARAM_SPACE if name != 'min_confidence'}
+    params['min_confidence'] = config.MIN_CONFIDENCE
+    return params
+
+
+def is_valid(params: Dict) -> bool:
+    return (params['ema_fast'] < params['ema_slow'] and params['trend_fast'] < params['trend_slow']
+            and params['rsi_oversold'] < params['rsi_overbought'])
+
+
+def ema_weights(period: int, lag: int = 0, window: int = SCAN_WINDOW) -> np.ndarray:
+    """w such that w @ closes equals calculate_ema(closes, period)[-1 - lag] for `window` closes"""
+    multiplier = 2 / (period + 1)
+    end = window - 1 - lag
+    weights = np.zeros(window)
+    # The SMA seed of the first `period` closes, decayed over every later step
+    weights[:period] = (1 - multiplier) ** (end - period + 1) / period
+    weights[period:end + 1] = multiplier * (1 - multiplier) ** (end - np.arange(period, end + 1))
+    return weights
+
+
+class History:
+    """Arrays for one symbol shared by every configuration.
+
+    Indicators are computed once per distinct period and trade outcomes once
+    per bar and direction (fixed SL/TP from config), so evaluating a
+    configuration is only threshold comparisons and a walk over entries.
+    Each bar's indicators use only the SCAN_WINDOW closes scan_pair would
+    have fetched, so votes match TradingStrategies (see check_parity).
+    """
+
+    def __init__(self, rows: List[List[str]], stop_loss: float, take_profit: float,
+                 max_hold: int, fee_rate: float):
+        data = np.asarray(rows, dtype=float)
+        self.times = data[:, 0]
+        self.highs = data[:, 2]
+        self.lows = data[:, 3]
+        self.closes = data[:, 4]
+        self.n = len(self.closes)
+        self.fold = np.zeros(self.n, dtype=np.int64)
+        self._ema: Dict[Tuple[int, int], np.ndarray] = {}
+        self._votes: Dict[tuple, Tuple[np.ndarray, np.ndarray]] = {}
+
+        closes = self.closes
+        self.rsi = self._rsi(closes, RSI_PERIOD)
+
+        # Breakout range: closes t-19 .. t-5, as in breakout_strategy
+        self.resistance = self._shift(sliding_window_view(closes, 15).max(axis=1), BREAKOUT_LOOKBACK - 1)
+        self.support = self._shift(sliding_window_view(closes, 15).min(axis=1), BREAKOUT_LOOKBACK - 1)
+
+        windows = sliding_window_view(closes, BOLLINGER_WINDOW)
+        self.sma = self._shift(windows.mean(axis=1), BOLLINGER_WINDOW - 1)
+        self.std = self._shift(windows.std(axis=1), BOLLINGER_WINDOW - 1)
+
+        # Least-squares slope of the last 10 closes as a convolution
+        x = np.arange(SLOPE_WINDOW) - (SLOPE_WINDOW - 1) / 2
+        self.slope = self._shift(np.convolve(closes, (x / (x ** 2).sum())[::-1], 'valid'), SLOPE_WINDOW - 1)
+
+        self.outcomes = {
+            1: self._outcomes(1, stop_loss, take_profit, max_hold, fee_rate),
+            -1: self._outcomes(-1, stop_loss, take_profit, max_hold, fee_rate),
+        }
+        # Entries need max_hold candles of future data; exit bars as lists for the trade walk
+        self.entry_limit = max(self.n - max_hold, 0)
+        self._exits = {direction: exits.tolist() for direction, (_, exits) in self.outcomes.items()}
+
+    def _shift(self, values: np.ndarray, offset: int) -> np.ndarray:
+        """Align a 'valid'-mode rolling result so index t uses data up to bar t"""
+        out = np.full(self.n, np.nan)
+        out[offset:] = values[:self.n - offset]
+        return out
+
+    def _rsi(self, closes: np.ndarray, period: int) -> np.ndarray:
+        """calculate_rsi at each bar: mean gain and loss over the last `period` changes"""
+        deltas = np.diff(closes)
+        if len(deltas) < period:
+            return np.full(self.n, np.nan)
+        up = self._shift(sliding_window_view(np.clip(deltas, 0, None), period).sum(axis=1) / period, period)
+        down = self._shift(sliding_window_view(np.clip(-deltas, 0, None), period).sum(axis=1) / period, period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100.0 - 100.0 / (1.0 + up / down)
+        return np.where(down == 0, 100.0, rsi)
+
+    def ema(self, period: int, lag: int = 0) -> np.ndarray:
+        """calculate_ema(window, period)[-1 - lag] for the scan window ending at each bar"""
+        cached = self._ema.get((period, lag))
+        if cached is None:
+            if self.n < SCAN_WINDOW:
+                cached = np.full(self.n, np.nan)
+            else:
+                # The EMA is seeded inside each window, so it is a fixed linear function of the window
+                windows = sliding_window_view(self.closes, SCAN_WINDOW)
+                cached = self._shift(windows @ ema_weights(period, lag), SCAN_WINDOW - 1)
+            self._ema[(period, lag)] = cached
+        return cached
+
+    def _outcomes(self, direction: int, stop_loss: float, take_profit: float,
+                  max_hold: int, fee_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(net return, exit bar) of entering at each close; NaN where history runs out"""
+        returns = np.full(self.n, np.nan)
+        exits = np.full(self.n, -1, dtype=np.int64)
+        count = self.n - max_hold
+        if count <= 0:
+            return returns, exits
+
+        entry = self.closes[:count]
+        highs = sliding_window_view(self.highs[1:], max_hold)[:count]
+        lows = sliding_window_view(self.lows[1:], max_hold)[:count]
+        if direction == 1:
+            hit_tp = highs >= (entry * (1 + take_profit))[:, None]
+            hit_sl = lows <= (entry * (1 - stop_loss))[:, None]
+        else:
+            hit_tp = lows <= (entry * (1 - take_profit))[:, None]
+            hit_sl = highs >= (entry * (1 + stop_loss))[:, None]
+
+        never = max_hold
+        first_tp = np.where(hit_tp.any(axis=1), hit_tp.argmax(axis=1), never)
+        first_sl = np.where(hit_sl.any(axis=1), hit_sl.argmax(axis=1), never)
+        timeout = direction * (self.closes[max_hold:max_hold + count] / entry - 1)
+
+        # A bar touching both levels counts as a stop
+        returns[:count] = np.where(first_sl <= first_tp,
+                                   np.where(first_sl < never, -stop_loss, timeout),
+                                   take_profit) - 2 * fee_rate
+        exits[:count] = np.arange(count) + 1 + np.minimum(np.minimum(first_sl, first_tp), never - 1)
+        return returns, exits
+
+    def _vote(self, key: tuple, compute) -> Tuple[np.ndarray, np.ndarray]:
+        """Memoised (vote, confidence) of one strategy setting: vote is +1/-1/0, confidence 0 where no vote"""
+        cached = self._votes.get(key)
+        if cached is None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                buy, buy_conf, sell, sell_conf = compute()
+            vote = buy.astype(np.int8) - sell.astype(np.int8)
+            confidence = np.where(buy, buy_conf, 0.0) + np.where(sell, sell_conf, 0.0)
+            cached = self._votes[key] = (vote, confidence.astype(np.float32))
+        return cached
+
+    def _rsi_vote(self, oversold: float, overbought: float):
+        rsi = self.rsi
+        return rsi < oversold, (oversold - rsi) / oversold, rsi > overbought, (rsi - overbought) / (100 - overbought)
+
+    def _crossover_vote(self, fast_period: int, slow_period: int):
+        fast, slow = self.ema(fast_period), self.ema(slow_period)
+        # The previous EMA values come from the same window, as ema[-2] does live
+        prev_fast, prev_slow = self.ema(fast_period, 1), self.ema(slow_period, 1)
+        return ((prev_fast <= prev_slow) & (fast > slow), np.minimum(0.3 + np.abs((fast - slow) / slow) * 10, 0.9),
+                (prev_fast >= prev_slow) & (fast < slow), np.minimum(0.3 + np.abs((slow - fast) / fast) * 10, 0.9))
+
+    def _breakout_vote(self, band: float):
+        closes, resistance, support = self.closes, self.resistance, self.support
+        return (closes > resistance * (1 + band), np.minimum(0.4 + (closes - resistance) / resistance * 20, 0.85),
+                closes < support * (1 - band), np.minimum(0.4 + (support - closes) / support * 20, 0.85))
+
+    def _trend_vote(self, fast_period: int, slow_period: int):
+        fast, slow = self.ema(fast_period), self.ema(slow_period)
+        return ((fast > slow) & (self.slope > 0), np.minimum(0.5 + np.abs((fast - slow) / slow) * 15, 0.88),
+                (fast < slow) & (self.slope < 0), np.minimum(0.5 + np.abs((slow - fast) / fast) * 15, 0.88))
+
+    def _bollinger_vote(self, k: float):
+        closes = self.closes
+        lower, upper = self.sma - k * self.std, self.sma + k * self.std
+        return (closes < lower, np.minimum(0.6 + (lower - closes) / lower * 25, 0.95),
+                closes > upper, np.minimum(0.6 + (closes - upper) / upper * 25, 0.95))
+
+    def votes(self, params: Dict) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Per-strategy votes for a configuration; each distinct setting is computed once"""
+        p = params
+        return [
+            self._vote(('rsi', p['rsi_oversold'], p['rsi_overbought']),
+                       lambda: self._rsi_vote(p['rsi_oversold'], p['rsi_overbought'])),
+            self._vote(('ema', p['ema_fast'], p['ema_slow']),
+                       lambda: self._crossover_vote(p['ema_fast'], p['ema_slow'])),
+            self._vote(('breakout', p['breakout_band']), lambda: self._breakout_vote(p['breakout_band'])),
+            self._vote(('trend', p['trend_fast'], p['trend_slow']),
+                       lambda: self._trend_vote(p['trend_fast'], p['trend_slow'])),
+            self._vote(('bollinger', p['bollinger_k']), lambda: self._bollinger_vote(p['bollinger_k'])),
+        ]
+
+    def signals(self, params: Dict) -> np.ndarray:
+        """+1/-1/0 per bar from the vectorised strategy vote.
+
+        Votes follow analyze_all_strategies on the candle data alone; the
+        order-flow vote and the ML blend of the confidence are not modelled.
+        """
+        buys = np.zeros(self.n, dtype=np.int8)
+        sells = np.zeros(self.n, dtype=np.int8)
+        total = np.zeros(self.n, dtype=np.float32)
+        for vote, confidence in self.votes(params):
+            buys += vote > 0
+            sells += vote < 0
+            total += confidence
+
+        # Like analyze_all_strategies, the confidence sum covers both sides
+        min_votes = params['min_votes']
+        long = (buys > sells) & (buys >= min_votes)
+        short = (sells > buys) & (sells >= min_votes)
+        voters = np.maximum(np.where(long, buys, sells), 1)
+        signal = long.astype(np.int8) - short.astype(np.int8)
+        signal[total < params['min_confidence'] * voters] = 0
+        signal[:SCAN_WINDOW - 1] = 0
+        return signal
+
+    def trades(self, params: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """(returns, entry folds) of non-overlapping trades, one position at a time"""
+        signal = self.signals(params)
+        candidates = np.flatnonzero(signal[:self.entry_limit])
+        bars = candidates.tolist()
+        directions = signal[candidates].tolist()
+
+        chosen = []
+        i = 0
+        while i < len(bars):
+            chosen.append(i)
+            # Skip signals while the position is open
+            i = bisect_left(bars, self._exits[directions[i]][bars[i]] + 1, i + 1)
+
+        entries = candidates[chosen]
+        long = signal[entries] > 0
+        returns = np.where(long, self.outcomes[1][0][entries], self.outcomes[-1][0][entries])
+        return returns, self.fold[entries]
+
+
+STRATEGY_NAMES = ['RSI', 'EMA_CROSSOVER', 'BREAKOUT', 'TREND', 'MEAN_REVERSION']  # order of History.votes
+VOTES = {'BUY': 1, 'SELL': -1, 'HOLD': 0}
+
+
+def check_parity(history: History, params: Dict, bars: int) -> Tuple[int, float]:
+    """(vote mismatches, max confidence difference) against TradingStrategies over the last bars"""
+    saved = default_params()
+    TradingStrategies.configure({name: value for name, value in params.items() if name != 'min_confidence'})
+    try:
+        votes = history.votes(params)
+        signal = history.signals(dict(params, min_confidence=0.0))
+        mismatches, max_diff = 0, 0.0
+        for t in range(max(history.n - bars, SCAN_WINDOW - 1), history.n):
+            window = history.closes[t - SCAN_WINDOW + 1:t + 1].tolist()
+            live = TradingStrategies.analyze_all_strategies(window)
+            mismatches += VOTES[live['final_signal']] != signal[t]
+            for name, (vote, confidence) in zip(STRATEGY_NAMES, votes):
+                result = live['individual_results'][name]
+                mismatches += VOTES[result['signal']] != vote[t]
+                max_diff = max(max_diff, abs(result['confidence'] - float(confidence[t])))
+        return mismatches, max_diff
+    finally:
+        TradingStrategies.configure({name: value for name, value in saved.items() if name != 'min_confidence'})
+
+
+def assign_folds(histories: List[History], n_folds: int):
+    """Split the shared time span into n_folds equal chronological segments"""
+    start = min(h.times[0] for h in histories)
+    end = max(h.times[-1] for h in histories)
+    edges = np.linspace(start, end, n_folds + 1)[1:-1]
+    for history in histories:
+        history.fold = np.searchsorted(edges, history.times, side='right')
+
+
+# Worker side: histories are built once in the parent and inherited (fork) or sent once per worker
+
+_HISTORIES: List[History] = []
+_N_FOLDS = 1
+
+
+def _init_worker(histories: List[History], n_folds: int):
+    global _HISTORIES, _N_FOLDS
+    _HISTORIES = histories
+    _N_FOLDS = n_folds
+
+
+def evaluate(params: Dict) -> Tuple[Dict, np.ndarray]:
+    """Per-fold [trades, sum, sum of squares, wins] over all symbols"""
+    stats = np.zeros((_N_FOLDS, 4))
+    for history in _HISTORIES:
+        returns, folds = history.trades(params)
+        if len(returns):
+            stats[:, 0] += np.bincount(folds, minlength=_N_FOLDS)
+            stats[:, 1] += np.bincount(folds, returns, minlength=_N_FOLDS)
+            stats[:, 2] += np.bincount(folds, returns ** 2, minlength=_N_FOLDS)
+            stats[:, 3] += np.bincount(folds, returns > 0, minlength=_N_FOLDS)
+    return params, stats
+
+
+def summarize(stats: np.ndarray) -> Dict[str, float]:
+    """Metrics from (summed) fold statistics; score is the t-statistic of per-trade returns"""
+    trades, total, squares, wins = stats if stats.ndim == 1 else stats.sum(axis=0)
+    if trades == 0:
+        return {'trades': 0, 'win_rate': 0.0, 'mean_return': 0.0, 'total_return': 0.0, 'score': 0.0}
+    mean = total / trades
+    std = np.sqrt(max(squares / trades - mean ** 2, 0.0))
+    return {
+        'trades': int(trades),
+        'win_rate': wins / trades,
+        'mean_return': mean,
+        'total_return': total,
+        'score': float(mean / std * np.sqrt(trades)) if std > 0 else 0.0,
+    }
+
+
+# Search strategies
+
+def grid_configs(space: Dict[str, List]) -> List[Dict]:
+    names = list(space)
+    configs = (dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names)))
+    return [c for c in configs if is_valid(c)]
+
+
+def random_configs(space: Dict[str, List], n: int, rng: np.random.Generator, seen=None) -> List[Dict]:
+    seen = set() if seen is None else seen
+    configs = []
+    for _ in range(n * 20):
+        if len(configs) >= n:
+            break
+        params = {name: values[int(rng.integers(len(values)))] for name, values in space.items()}
+        key = tuple(params.values())
+        if key in seen or not is_valid(params):
+            continue
+        seen.add(key)
+        configs.append(params)
+    return configs
+
+
+def _setting_configs(space: Dict[str, List]) -> List[Dict]:
+    """Configurations covering every distinct per-strategy setting of the space"""
+    base = {name: values[0] for name, values in space.items()}
+    pairs = [('rsi_oversold', 'rsi_overbought'), ('ema_fast', 'ema_slow'), ('trend_fast', 'trend_slow'),
+             ('breakout_band',), ('bollinger_k',)]
+    configs = []
+    for names in pairs:
+        for values in itertools.product(*(space[n] for n in names)):
+            params = dict(base, **dict(zip(names, values)))
+            configs.append(params)
+    return configs
+
+
+def _encode(params: Dict, space: Dict[str, List]) -> List[float]:
+    return [space[n].index(params[n]) / max(len(space[n]) - 1, 1) for n in space]
+
+
+class Optimizer:
+    """Evaluates strategy configurations over stored candles on a process pool"""
+
+    def __init__(self, klines: Dict[str, List[List[str]]], space: Optional[Dict[str, List]] = None,
+                 n_folds: int = 5, workers: Optional[int] = None, max_hold: int = 96,
+                 fee_rate: Optional[float] = None, seed: int = 0, min_trades: int = 20):
+        self.min_trades = min_trades
+        self.space = {name: list(values) for name, values in (space or PARAM_SPACE).items()}
+        self.n_folds = n_folds
+        self.workers = workers or os.cpu_count() or 1
+        self.rng = np.random.default_rng(seed)
+        fee_rate = config.PAPER_FEE_RATE / 100 if fee_rate is None else fee_rate
+
+        start = time.perf_counter()
+        self.histories = [
+            History(rows, config.STOP_LOSS_PERCENT / 100, config.TAKE_PROFIT_PERCENT / 100, max_hold, fee_rate)
+            for rows in klines.values() if len(rows) > max_hold + 100
+        ]
+        assign_folds(self.histories, n_folds)
+        # Every strategy vote in the space is computed here so workers inherit it
+        for history in self.histories:
+            for params in _setting_configs(self.space):
+                history.votes(params)
+        self.precompute_seconds = time.perf_counter() - start
+
+        self.results: List[Tuple[Dict, np.ndarray]] = []
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self._pool = multiprocessing.Pool(self.workers, _init_worker, (self.histories, self.n_folds))
+        else:
+            _init_worker(self.histories, self.n_folds)
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def evaluate(self, configs: List[Dict]) -> List[Tuple[Dict, np.ndarray]]:
+        if self._pool is None:
+            results = [evaluate(c) for c in configs]
+        else:
+            chunk = max(len(configs) // (self.workers * 4), 1)
+            results = list(self._pool.imap_unordered(evaluate, configs, chunksize=chunk))
+        self.results.extend(results)
+        return results
+
+    def grid(self) -> List[Tuple[Dict, np.ndarray]]:
+        return self.evaluate(grid_configs(self.space))
+
+    def random(self, trials: int) -> List[Tuple[Dict, np.ndarray]]:
+        return self.evaluate(random_configs(self.space, trials, self.rng))
+
+    def bayesian(self, trials: int, initial: Optional[int] = None, pool_size: int = 2000):
+        """Gaussian-process search with expected improvement, in batches of `workers`"""
+        from scipy.stats import norm
+        from sklearn.gaussian_process import GaussianProcessRegressor
+        from sklearn.gaussian_process.kernels import Matern, WhiteKernel
+
+        seen = set()
+        initial = initial or max(min(trials // 4, 50), self.workers)
+        self.evaluate(random_configs(self.space, initial, self.rng, seen))
+
+        while len(self.results) < trials:
+            X = np.array([_encode(p, self.space) for p, _ in self.results])
+            y = np.array([summarize(s)['score'] if summarize(s)['trades'] >= self.min_trades else 0.0
+                          for _, s in self.results])
+            gp = GaussianProcessRegressor(Matern(nu=2.5) + WhiteKernel(), normalize_y=True,
+                                          random_state=int(self.rng.integers(1 << 31)))
+            gp.fit(X, y)
+
+            candidates = random_configs(self.space, pool_size, self.rng, set(seen))
+            if not candidates:
+                break
+            mean, std = gp.predict(np.array([_encode(c, self.space) for c in candidates]), return_std=True)
+            improvement = mean - y.max() - 0.01
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z = improvement / std
+                expected = np.where(std > 0, improvement * norm.cdf(z) + std * norm.pdf(z), 0.0)
+
+            batch = [candidates[i] for i in np.argsort(-expected)[:min(self.workers, trials - len(self.results))]]
+            seen.update(tuple(c.values()) for c in batch)
+            self.evaluate(batch)
+        return self.results
+
+    def _score(self, stats: np.ndarray) -> float:
+        """Selection score; configurations with too few trades rank last"""
+        summary = summarize(stats)
+        return summary['score'] if summary['trades'] >= self.min_trades else float('-inf')
+
+    def walk_forward(self) -> Dict:
+        """Anchored walk-forward: pick the best config on folds < i, score it on fold i"""
+        steps = []
+        oos = np.zeros(4)
+        for i in range(1, self.n_folds):
+            params, stats = max(self.results, key=lambda r: self._score(r[1][:i]))
+            oos += stats[i]
+            steps.append({'fold': i, 'params': params,
+                          'in_sample': summarize(stats[:i]), 'out_of_sample': summarize(stats[i])})
+        return {'steps': steps, 'out_of_sample': summarize(oos)}
+
+    def ranked(self, top: int = 20) -> List[Dict]:
+        """Configurations by full-history score, with their mean per-fold score.
+
+        Every fold is in-sample here; only walk_forward() reports held-out results.
+        """
+        rows = []
+        for params, stats in self.results:
+            row = {'params': params, **summarize(stats)}
+            row['fold_mean_score'] = float(np.mean([summarize(stats[i])['score'] for i in range(self.n_folds)]))
+            rows.append(row)
+        rows.sort(key=lambda r: (r['trades'] < self.min_trades, -r['score']))
+        return rows[:top]
+
+    def report(self, top: int = 20) -> Dict:
+        default = evaluate(default_params()) if self._pool is None else self._pool.apply(evaluate, (default_params(),))
+        return {
+            'symbols': len(self.histories),
+            'bars': int(sum(h.n for h in self.histories)),
+            'configs': len(self.results),
+            'precompute_seconds': self.precompute_seconds,
+            'default': {'params': default[0], **summarize(default[1])},
+            'ranked': self.ranked(top),
+            'walk_forward': self.walk_forward(),
+        }
+
+
+def format_table(rows: List[Dict]) -> str:
+    names = list(rows[0]['params']) if rows else []
+    header = ['#', 'score', 'fold_mean', 'trades', 'win%', 'ret%'] + names
+    table = [header]
+    for rank, row in enumerate(rows, 1):
+        cells = [rank, f"{row['score']:.2f}", f"{row['fold_mean_score']:.2f}", row['trades'],
+                 f"{row['win_rate'] * 100:.1f}", f"{row['total_return'] * 100:.1f}"]
+        table.append([str(c) for c in cells + [row['params'][n] for n in names]])
+    widths = [max(len(str(line[i])) for line in table) for i in range(len(header))]
+    return '\n'.join('  '.join(f"{str(c):>{w}}" for c, w in zip(line, widths)) for line in table)
+
+
+def main():
+    from mock_bybit import load_kline_fixtures, generate_kline_fixtures
+
+    parser = argparse.ArgumentParser(description="Search strategy thresholds over stored candles")
+    parser.add_argument('--data', help="Kline JSON {symbol: rows oldest first}; synthetic data if omitted")
+    parser.add_argument('--pairs', type=int, default=10, help="Number of synthetic pairs")
+    parser.add_argument('--days', type=float, default=365, help="Days of synthetic 15m candles")
+    parser.add_argument('--method', choices=['grid', 'random', 'bayes'], default='random')
+    parser.add_argument('--trials', type=int, default=500, help="Configurations for random/bayes search")
+    parser.add_argument('--space', help="JSON {param: [values]} overriding PARAM_SPACE entries")
+    parser.add_argument('--folds', type=int, default=5, help="Chronological folds for walk-forward validation")
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument('--max-hold', type=int, default=96, help="Candles before an open trade is closed")
+    parser.add_argument('--min-trades', type=int, default=20, help="Rank configs with fewer trades last")
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the full report to this JSON file")
+    parser.add_argument('--save-params', help="Write the best walk-forward params (for STRATEGY_PARAMS)")
+    parser.add_argument('--verify', type=int, default=0, metavar='BARS',
+                        help="Compare the vectorised votes with TradingStrategies on the last BARS bars "
+                             "of each symbol for every setting in the space, then exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.data:
+        klines = load_kline_fixtures(args.data)
+    else:
+        symbols = [f"PAIR{i:03d}USDT" for i in range(args.pairs)]
+        klines = generate_kline_fixtures(symbols, int(args.days * 96))
+
+    space = dict(PARAM_SPACE)
+    if args.space:
+        space.update(json.loads(args.space))
+
+    if args.verify:
+        fee_rate = config.PAPER_FEE_RATE / 100
+        histories = [History(rows, config.STOP_LOSS_PERCENT / 100, config.TAKE_PROFIT_PERCENT / 100,
+                             args.max_hold, fee_rate) for rows in klines.values()]
+        settings = [default_params()] + [p for p in _setting_configs(space) if is_valid(p)]
+        mismatches, max_diff = 0, 0.0
+        for history in histories:
+            for params in settings:
+                count, diff = check_parity(history, params, args.verify)
+                mismatches += count
+                max_diff = max(max_diff, diff)
+        print(f"{len(settings)} settings x {len(histories)} symbols x {args.verify} bars: "
+              f"{mismatches} vote mismatches, max |confidence diff| {max_diff:.3g}")
+        # Confidences are stored as float32
+        if mismatches or max_diff > 1e-6:
+            sys.exit(1)
+        return
+
+    start = time.perf_counter()
+    with Optimizer(klines, space, args.folds, args.workers, args.max_hold, seed=args.seed,
+                   min_trades=args.min_trades) as optimizer:
+        if args.method == 'grid':
+            optimizer.grid()
+        elif args.method == 'bayes':
+            optimizer.bayesian(args.trials)
+        else:
+            optimizer.random(args.trials)
+        report = optimizer.report(args.top)
+    report['wall_seconds'] = time.perf_counter() - start
+
+    wf = report['walk_forward']
+    print(f"{report['configs']} configs x {report['symbols']} symbols ({report['bars']} bars) "
+          f"in {report['wall_seconds']:.1f}s (precompute {report['precompute_seconds']:.1f}s)\n")
+    print(format_table(report['ranked']))
+    default = report['default']
+    print(f"\nCurrent thresholds: score {default['score']:.2f}, {default['trades']} trades, "
+          f"return {default['total_return'] * 100:.1f}%")
+    print(f"Walk-forward out-of-sample: score {wf['out_of_sample']['score']:.2f}, "
+          f"{wf['out_of_sample']['trades']} trades, return {wf['out_of_sample']['total_return'] * 100:.1f}%")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
+    if args.save_params and wf['steps']:
+        with open(args.save_params, 'w') as f:
+            json.dump(wf['steps'][-1]['params'], f, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
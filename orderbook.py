@@ -0,0 +1,354 @@
+import asyncio
+import json
+import logging
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_STREAM_URL = 'wss://stream.bybit.com/v5/public/linear'
+PUBLIC_STREAM_URL_TESTNET = 'wss://stream-testnet.bybit.com/v5/public/linear'
+
+
+class RollingWindow:
+    """Time-windowed running sum/mean; timestamps in milliseconds"""
+
+    __slots__ = ('window_ms', 'samples', 'total')
+
+    def __init__(self, window_ms: float):
+        self.window_ms = window_ms
+        self.samples: Deque[Tuple[float, float]] = deque()
+        self.total = 0.0
+
+    def add(self, ts: float, value: float):
+        self.samples.append((ts, value))
+        self.total += value
+        self.evict(ts)
+
+    def evict(self, now: float):
+        cutoff = now - self.window_ms
+        samples = self.samples
+        while samples and samples[0][0] < cutoff:
+            self.total -= samples.popleft()[1]
+
+    def mean(self) -> Optional[float]:
+        return self.total / len(self.samples) if self.samples else None
+
+
+class OrderBook:
+    """L2 book for one symbol built from Bybit snapshot/delta messages.
+
+    Levels live in a dict per side with a sorted price list alongside, so a
+    delta is a dict update plus a bisect insert/remove and the best levels
+    are read from the ends of the lists.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self._bid_prices: List[float] = []  # ascending; best bid last
+        self._ask_prices: List[float] = []  # ascending; best ask first
+        self.update_id: Optional[int] = None
+        self.ts = 0.0
+
+    @staticmethod
+    def _apply(levels: Dict[float, float], prices: List[float], updates: Iterable):
+        for price, size in updates:
+            price = float(price)
+            size = float(size)
+            if size == 0:
+                if levels.pop(price, None) is not None:
+                    del prices[bisect_left(prices, price)]
+            else:
+                if price not in levels:
+                    insort(prices, price)
+                levels[price] = size
+
+    def apply_snapshot(self, bids: Iterable, asks: Iterable, update_id: Optional[int] = None, ts: float = 0.0):
+        self.bids.clear()
+        self.asks.clear()
+        self._bid_prices.clear()
+        self._ask_prices.clear()
+        self.apply_delta(bids, asks, update_id, ts)
+
+    def apply_delta(self, bids: Iterable, asks: Iterable, update_id: Optional[int] = None, ts: float = 0.0):
+        self._apply(self.bids, self._bid_prices, bids)
+        self._apply(self.asks, self._ask_prices, asks)
+        self.update_id = update_id
+        self.ts = ts
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self._bid_prices[-1] if self._bid_prices else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self._ask_prices[0] if self._ask_prices else None
+
+    def mid(self) -> Optional[float]:
+        if not self._bid_prices or not self._ask_prices:
+            return None
+        return (self._bid_prices[-1] + self._ask_prices[0]) / 2
+
+    def spread_bps(self) -> Optional[float]:
+        mid = self.mid()
+        if not mid:
+            return None
+        return (self._ask_prices[0] - self._bid_prices[-1]) / mid * 10000
+
+    def imbalance(self, levels: int) -> Optional[float]:
+        """(bid size - ask size) / total over the top `levels` of each side, in [-1, 1]"""
+        bids = self.bids
+        asks = self.asks
+        bid_size = sum(bids[p] for p in self._bid_prices[-levels:])
+        ask_size = sum(asks[p] for p in self._ask_prices[:levels])
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total else None
+
+
+class TradeFlow:
+    """Aggressor-side notional over a rolling window of public trades"""
+
+    def __init__(self, window_ms: float):
+        self.buys = RollingWindow(window_ms)
+        self.sells = RollingWindow(window_ms)
+        self.ts = 0.0
+
+    def add(self, ts: float, side: str, size: float, price: float):
+        (self.buys if side == 'Buy' else self.sells).add(ts, size * price)
+        self.ts = max(self.ts, ts)
+
+    def imbalance(self) -> Optional[float]:
+        self.buys.evict(self.ts)
+        self.sells.evict(self.ts)
+        total = self.buys.total + self.sells.total
+        return (self.buys.total - self.sells.total) / total if total > 0 else None
+
+    def trade_rate(self) -> float:
+        """Trades per second over the window"""
+        count = len(self.buys.samples) + len(self.sells.samples)
+        return count / (self.buys.window_ms / 1000)
+
+
+class MicrostructureFeed:
+    """Books and trade flow per symbol, fed with Bybit public-stream messages.
+
+    Spread and imbalance are sampled at most every `sample_interval_ms` of
+    exchange time into rolling windows, so bursts of deltas only pay for
+    the book update itself. Timestamps come from the messages, which keeps
+    replays of recorded feeds deterministic.
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None, levels: Optional[int] = None,
+                 sample_interval_ms: float = 100.0):
+        window_ms = (config.MICROSTRUCTURE_WINDOW if window_seconds is None else window_seconds) * 1000
+        self.window_ms = window_ms
+        self.levels = config.ORDERBOOK_IMBALANCE_LEVELS if levels is None else levels
+        self.sample_interval_ms = sample_interval_ms
+        self.books: Dict[str, OrderBook] = {}
+        self.flows: Dict[str, TradeFlow] = {}
+        self._spreads: Dict[str, RollingWindow] = {}
+        self._imbalances: Dict[str, RollingWindow] = {}
+        self._sampled_at: Dict[str, float] = {}
+        self.messages = 0
+        self.out_of_order = 0
+
+    def on_message(self, message: Dict):
+        """Apply one decoded stream message (orderbook.* or publicTrade.*)"""
+        topic = message.get('topic', '')
+        if topic.startswith('orderbook.'):
+            self._on_orderbook(message)
+        elif topic.startswith('publicTrade.'):
+            self._on_trades(message)
+        else:
+            return
+        self.messages += 1
+
+    def replay(self, messages: Iterable[Dict]):
+        for message in messages:
+            self.on_message(message)
+
+    def _on_orderbook(self, message: Dict):
+        data = message['data']
+        symbol = data['s']
+        ts = float(message.get('ts', 0))
+        update_id = data.get('u')
+        book = self.books.get(symbol)
+
+        # u == 1 is Bybit's snapshot resend after a service restart
+        if message.get('type') == 'snapshot' or update_id == 1:
+            if book is None:
+                book = self.books[symbol] = OrderBook(symbol)
+            book.apply_snapshot(data.get('b', ()), data.get('a', ()), update_id, ts)
+        elif book is None or book.update_id is None or (update_id is not None and update_id <= book.update_id):
+            # Delta without a snapshot to apply it to, or a replayed one
+            self.out_of_order += 1
+            return
+        else:
+            book.apply_delta(data.get('b', ()), data.get('a', ()), update_id, ts)
+
+        if ts - self._sampled_at.get(symbol, float('-inf')) >= self.sample_interval_ms:
+            self._sampled_at[symbol] = ts
+            spread = book.spread_bps()
+            imbalance = book.imbalance(self.levels)
+            if spread is not None:
+                self._window(self._spreads, symbol).add(ts, spread)
+            if imbalance is not None:
+                self._window(self._imbalances, symbol).add(ts, imbalance)
+
+    def _on_trades(self, message: Dict):
+        for trade in message['data']:
+            symbol = trade['s']
+            flow = self.flows.get(symbol)
+            if flow is None:
+                flow = self.flows[symbol] = TradeFlow(self.window_ms)
+            flow.add(float(trade['T']), trade['S'], float(trade['v']), float(trade['p']))
+
+    def _window(self, windows: Dict[str, RollingWindow], symbol: str) -> RollingWindow:
+        window = windows.get(symbol)
+        if window is None:
+            window = windows[symbol] = RollingWindow(self.window_ms)
+        return window
+
+    def features(self, symbol: str) -> Optional[Dict[str, float]]:
+        """Current microstructure features, or None without a live book for symbol"""
+        book = self.books.get(symbol)
+        if book is None or book.mid() is None:
+            return None
+
+        spread = book.spread_bps()
+        imbalance = book.imbalance(self.levels) or 0.0
+        avg_spread = self._rolling_mean(self._spreads, symbol, book.ts)
+        avg_imbalance = self._rolling_mean(self._imbalances, symbol, book.ts)
+        flow = self.flows.get(symbol)
+        flow_imbalance = flow.imbalance() if flow is not None else None
+
+        return {
+            'spread_bps': spread,
+            'book_imbalance': imbalance,
+            'avg_spread_bps': spread if avg_spread is None else avg_spread,
+            'avg_book_imbalance': imbalance if avg_imbalance is None else avg_imbalance,
+            'trade_flow_imbalance': 0.0 if flow_imbalance is None else flow_imbalance,
+            'trade_rate': flow.trade_rate() if flow is not None else 0.0,
+        }
+
+    def mid(self, symbol: str) -> Optional[float]:
+        book = self.books.get(symbol)
+        return book.mid() if book is not None else None
+
+    @staticmethod
+    def _rolling_mean(windows: Dict[str, RollingWindow], symbol: str, now: float) -> Optional[float]:
+        window = windows.get(symbol)
+        if window is None:
+            return None
+        window.evict(now)
+        return window.mean()
+
+    def forget(self, symbol: str):
+        """Free the book and rolling state of a symbol"""
+        for store in (self.books, self.flows, self._spreads, self._imbalances, self._sampled_at):
+            store.pop(symbol, None)
+
+    def reset(self):
+        """Drop all books (e.g. after a disconnect; fresh snapshots follow on resubscribe)"""
+        self.books.clear()
+        self._sampled_at.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'books': len(self.books),
+            'messages': self.messages,
+            'out_of_order': self.out_of_order,
+        }
+
+
+class BybitPublicStream:
+    """Bybit V5 public WebSocket client that feeds a MicrostructureFeed.
+
+    Requires the optional `websockets` package. Reconnects with backoff and
+    can append every raw message to `record_path` (JSON lines) for replays.
+    """
+
+    def __init__(self, feed: MicrostructureFeed, symbols: Iterable[str], depth: Optional[int] = None,
+                 url: Optional[str] = None, record_path: Optional[str] = None, ping_interval: float = 20.0):
+        self.feed = feed
+        self.symbols = list(symbols)
+        self.depth = config.ORDERBOOK_DEPTH if depth is None else depth
+        self.url = url or (PUBLIC_STREAM_URL_TESTNET if config.BYBIT_TESTNET else PUBLIC_STREAM_URL)
+        self.record_path = record_path
+        self.ping_interval = ping_interval
+        self._ws = None
+
+    def topics(self, symbols: Iterable[str]) -> List[str]:
+        return [topic for s in symbols for topic in (f"orderbook.{self.depth}.{s}", f"publicTrade.{s}")]
+
+    async def _send_op(self, op: str, topics: List[str]):
+        # Bybit caps the number of args per request
+        for i in range(0, len(topics), 10):
+            await self._ws.send(json.dumps({'op': op, 'args': topics[i:i + 10]}))
+
+    async def subscribe(self, symbols: Iterable[str]):
+        symbols = [s for s in symbols if s not in self.symbols]
+        self.symbols.extend(symbols)
+        if self._ws is not None and symbols:
+            await self._send_op('subscribe', self.topics(symbols))
+
+    async def unsubscribe(self, symbols: Iterable[str]):
+        symbols = [s for s in symbols if s in self.symbols]
+        for symbol in symbols:
+            self.symbols.remove(symbol)
+            self.feed.forget(symbol)
+        if self._ws is not None and symbols:
+            await self._send_op('unsubscribe', self.topics(symbols))
+
+    async def _ping(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await self._ws.send('{"op":"ping"}')
+
+    async def run(self):
+        try:
+            import websockets
+        except ImportError:
+            logger.error("Public stream disabled: install the optional 'websockets' package")
+            return
+
+        record = open(self.record_path, 'a') if self.record_path else None
+        backoff = 1
+        try:
+            while True:
+                try:
+                    async with websockets.connect(self.url, ping_interval=None) as ws:
+                        self._ws = ws
+                        backoff = 1
+                        await self._send_op('subscribe', self.topics(self.symbols))
+                        logger.info("📡 Public stream connected: %d symbols", len(self.symbols))
+                        pinger = asyncio.create_task(self._ping())
+                        try:
+                            async for raw in ws:
+                                if record is not None:
+                                    record.write(raw if raw.endswith('\n') else raw + '\n')
+                                self.feed.on_message(json.loads(raw))
+                        finally:
+                            pinger.cancel()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Public stream disconnected (%s); reconnecting in %ss", e, backoff)
+                self._ws = None
+                self.feed.reset()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+        finally:
+            if record is not None:
+                record.close()
+
+
+def load_stream_messages(path: str) -> List[Dict]:
+    """Messages recorded by BybitPublicStream(record_path=...)"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
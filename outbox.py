@@ -0,0 +1,187 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_TRADE = 0   # trade execution results and button replies
+PRIORITY_UPDATE = 1  # edits of existing alerts (expiry, digest refresh)
+
+
+class TelegramOutbox:
+    """Outbound Telegram queue, decoupled from scanning.
+
+    Trade confirmations are delivered before anything else, new signal
+    alerts are coalesced into digests, and every API call is throttled to
+    `rate_limit` messages per second with RetryAfter/network backoff.
+    """
+
+    def __init__(self, get_bot: Callable, deliver_alerts: Callable[[List[Tuple[str, Dict]]], Awaitable],
+                 metrics=None, rate_limit: Optional[float] = None, coalesce_window: Optional[float] = None,
+                 max_batch: Optional[int] = None, max_retries: int = 5):
+        self.get_bot = get_bot
+        self.deliver_alerts = deliver_alerts
+        self.metrics = metrics
+        self.rate_limit = config.TELEGRAM_RATE_LIMIT if rate_limit is None else rate_limit
+        self.coalesce_window = config.ALERT_COALESCE_WINDOW if coalesce_window is None else coalesce_window
+        self.max_batch = config.ALERT_DIGEST_MAX if max_batch is None else max_batch
+        self.max_retries = max_retries
+
+        self._messages: List[tuple] = []  # heap of (priority, seq, enqueued_at, method, kwargs)
+        self._alerts: List[Tuple[float, str, Dict]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False
+        self._next_send_at = 0.0
+
+        self.sent = 0
+        self.dropped = 0
+        self.flood_waits = 0
+
+    def __len__(self) -> int:
+        return len(self._messages) + len(self._alerts)
+
+    # Producers (never block)
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+        self._wakeup.set()
+
+    def send(self, text: str, reply_markup=None, priority: int = PRIORITY_UPDATE,
+             message_id: Optional[int] = None):
+        """Queue a new message, or an edit of message_id"""
+        kwargs = {'chat_id': config.ADMIN_CHAT_ID, 'text': text, 'reply_markup': reply_markup}
+        method = 'send_message'
+        if message_id is not None:
+            method = 'edit_message_text'
+            kwargs['message_id'] = message_id
+        heapq.heappush(self._messages, (priority, next(self._seq), time.perf_counter(), method, kwargs))
+        self._ensure_worker()
+
+    def submit_alert(self, alert_id: str, signal: Dict):
+        """Queue a signal alert; alerts arriving within the coalesce window share one digest"""
+        self._alerts.append((time.perf_counter(), alert_id, signal))
+        self._ensure_worker()
+
+    # Delivery
+
+    async def _throttle(self):
+        loop = asyncio.get_running_loop()
+        wait = self._next_send_at - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if self.rate_limit > 0:
+            self._next_send_at = max(loop.time(), self._next_send_at) + 1 / self.rate_limit
+
+    async def call(self, method: str, **kwargs):
+        """Throttled Bot API call with flood-control and network retries; None on failure"""
+        for attempt in range(self.max_retries + 1):
+            await self._throttle()
+            start = time.perf_counter()
+            try:
+                result = await getattr(self.get_bot(), method)(**kwargs)
+                if self.metrics:
+                    self.metrics.record('telegram_api', time.perf_counter() - start)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                self.flood_waits += 1
+                self._next_send_at = asyncio.get_running_loop().time() + retry_after
+                logger.warning("Telegram flood control: retrying %s in %ss", method, retry_after)
+            except BadRequest as e:
+                # Not retryable (message not modified, message deleted, ...)
+                logger.warning("Telegram rejected %s: %s", method, e)
+                break
+            except NetworkError as e:
+                backoff = min(2 ** attempt, 30)
+                logger.warning("Telegram %s failed (%s); retrying in %ss", method, e, backoff)
+                await asyncio.sleep(backoff)
+
+        self.dropped += 1
+        logger.error("Dropped Telegram %s after %d attempts", method, self.max_retries + 1)
+        return None
+
+    async def _wait(self, timeout: float):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        """Worker: urgent messages first, then coalesced alert digests"""
+        while True:
+            if self._messages:
+                self._busy = True
+                _, _, enqueued_at, method, kwargs = heapq.heappop(self._messages)
+                if self.metrics:
+                    self.metrics.record('outbox_wait', time.perf_counter() - enqueued_at)
+                await self.call(method, **kwargs)
+                continue
+
+            if self._alerts:
+                wait = self._alerts[0][0] + self.coalesce_window - time.perf_counter()
+                if wait > 0:
+                    await self._wait(wait)
+                    continue
+                self._busy = True
+                batch, self._alerts = self._alerts[:self.max_batch], self._alerts[self.max_batch:]
+                now = time.perf_counter()
+                if self.metrics:
+                    for enqueued_at, _, _ in batch:
+                        self.metrics.record('outbox_wait', now - enqueued_at)
+                try:
+                    await self.deliver_alerts([(alert_id, signal) for _, alert_id, signal in batch])
+                except Exception as e:
+                    logger.error("Failed to deliver alert digest: %s", e)
+                continue
+
+            self._busy = False
+            await self._wait(3600)
+
+    async def drain(self, poll: float = 0.01):
+        """Wait until every queued message has been delivered"""
+        while len(self) or self._busy:
+            await asyncio.sleep(poll)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'queued': len(self),
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'flood_waits': self.flood_waits,
+        }
+
+
+class OutboxReply:
+    """Stand-in for CallbackQuery.edit_message_text that routes replies through the outbox"""
+
+    def __init__(self, outbox: TelegramOutbox, message_id: Optional[int] = None):
+        self.outbox = outbox
+        self.message_id = message_id
+
+    async def edit_message_text(self, text: str, reply_markup=None, **kwargs):
+        self.outbox.send(text, reply_markup, PRIORITY_TRADE, self.message_id)
@@ -0,0 +1,310 @@
+import bisect
+import itertools
+import logging
+from typing import Dict, List, Optional
+
+from config import config
+from clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+_INF = float('inf')
+
+
+class TriggerIndex:
+    """Price-sorted conditional orders for one symbol.
+
+    Orders that fire on a rise are kept ascending by trigger price and orders
+    that fire on a fall are kept in a second ascending list, so a tick only
+    touches the orders that actually fire: O(log n + k) per tick.
+    """
+
+    def __init__(self):
+        self._rise: List[tuple] = []  # (trigger_price, seq, order_id), fires when price >= trigger
+        self._fall: List[tuple] = []  # (trigger_price, seq, order_id), fires when price <= trigger
+        self._orders: Dict[str, Dict] = {}
+        self._seq = itertools.count()
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def add(self, order: Dict):
+        key = (order['trigger_price'], next(self._seq), order['order_id'])
+        bisect.insort(self._rise if order['trigger_direction'] == 'rise' else self._fall, key)
+        self._orders[order['order_id']] = order
+
+    def cancel(self, order_id: str) -> Optional[Dict]:
+        """Cancel lazily; dead entries are dropped when swept or compacted"""
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            self._dead += 1
+            if self._dead > 64 and self._dead > len(self._orders):
+                self._compact()
+        return order
+
+    def _compact(self):
+        self._rise = [k for k in self._rise if k[2] in self._orders]
+        self._fall = [k for k in self._fall if k[2] in self._orders]
+        self._dead = 0
+
+    def pop_triggered(self, high: float, low: float) -> List[Dict]:
+        """Remove and return orders triggered by a price range [low, high]"""
+        fired = []
+
+        i = bisect.bisect_right(self._rise, (high, _INF))
+        if i:
+            for key in self._rise[:i]:
+                order = self._orders.pop(key[2], None)
+                if order is not None:
+                    fired.append(order)
+                else:
+                    self._dead -= 1
+            del self._rise[:i]
+
+        j = bisect.bisect_left(self._fall, (low, -_INF))
+        if j < len(self._fall):
+            for key in self._fall[j:]:
+                order = self._orders.pop(key[2], None)
+                if order is not None:
+                    fired.append(order)
+                else:
+                    self._dead -= 1
+            del self._fall[j:]
+
+        return fired
+
+    def orders(self) -> List[Dict]:
+        return list(self._orders.values())
+
+
+class PaperTradingClient:
+    """In-memory execution backend with the BybitClient interface.
+
+    Market data is passed through from `market_data` (e.g. a public
+    BybitClient); orders, positions, leverage, balance and SL/TP triggers are
+    simulated locally with configurable slippage and taker fees.
+    """
+
+    def __init__(self, market_data=None, balance: Optional[float] = None, fee_rate: Optional[float] = None,
+                 slippage: Optional[float] = None, clock=None):
+        self.market_data = market_data
+        self.clock = clock or SystemClock()
+        self.wallet_balance = config.PAPER_BALANCE if balance is None else balance
+        self.fee_rate = config.PAPER_FEE_RATE / 100 if fee_rate is None else fee_rate
+        self.slippage = config.PAPER_SLIPPAGE / 100 if slippage is None else slippage
+
+        self.last_prices: Dict[str, float] = {}
+        self.leverage: Dict[str, float] = {}
+        self.positions: Dict[str, Dict] = {}
+        self.triggers: Dict[str, TriggerIndex] = {}
+        self.closed_trades: List[Dict] = []
+        self.fees_paid = 0.0
+        self._order_ids = itertools.count(1)
+
+    # Price feed
+
+    def update_price(self, symbol: str, price: float):
+        """Apply a streamed trade/mark price"""
+        self.update_candle(symbol, price, price, price)
+
+    def update_candle(self, symbol: str, high: float, low: float, close: float):
+        """Apply a candle: evaluate triggers over its range, then mark at the close"""
+        index = self.triggers.get(symbol)
+        if index is not None and len(index):
+            fired = index.pop_triggered(high, low)
+            # Stop losses first: when a candle spans both levels assume the worst
+            fired.sort(key=lambda o: o['stop_order_type'] != 'StopLoss')
+            for order in fired:
+                self._execute_conditional(order)
+        self.last_prices[symbol] = close
+
+    def latest_price(self, symbol: str) -> Optional[float]:
+        price = self.last_prices.get(symbol)
+        if price is None and self.market_data is not None:
+            self.get_market_data(symbol, '1', 1)
+            price = self.last_prices.get(symbol)
+        return price
+
+    # Execution
+
+    def _next_order_id(self) -> str:
+        return f"paper-{next(self._order_ids)}"
+
+    def _fill_price(self, side: str, price: float) -> float:
+        return price * (1 + self.slippage) if side == 'Buy' else price * (1 - self.slippage)
+
+    def _charge_fee(self, price: float, qty: float):
+        fee = price * qty * self.fee_rate
+        self.wallet_balance -= fee
+        self.fees_paid += fee
+
+    def _fill(self, symbol: str, side: str, qty: float, price: float, reason: str = 'Market'):
+        """Net a fill into the one-way position for symbol, realising P&L on any reduction"""
+        self._charge_fee(price, qty)
+        signed = qty if side == 'Buy' else -qty
+        position = self.positions.get(symbol)
+
+        if position is None:
+            self.positions[symbol] = {
+                'symbol': symbol,
+                'size': signed,
+                'entry_price': price,
+                'opened_at': self.clock.time(),
+                'stop_loss_id': None,
+                'take_profit_id': None,
+            }
+            return
+
+        if (position['size'] > 0) == (signed > 0):
+            total = position['size'] + signed
+            position['entry_price'] = (position['entry_price'] * position['size'] + price * signed) / total
+            position['size'] = total
+            return
+
+        closing = min(abs(signed), abs(position['size']))
+        direction = 1 if position['size'] > 0 else -1
+        pnl = (price - position['entry_price']) * closing * direction
+        self.wallet_balance += pnl
+        self.closed_trades.append({
+            'symbol': symbol,
+            'side': 'Buy' if direction > 0 else 'Sell',
+            'qty': closing,
+            'entry_price': position['entry_price'],
+            'exit_price': price,
+            'pnl': pnl,
+            'reason': reason,
+            'opened_at': position['opened_at'],
+            'closed_at': self.clock.time(),
+        })
+
+        remaining = position['size'] + signed
+        if abs(remaining) < 1e-12:
+            self._cancel_position_triggers(position)
+            del self.positions[symbol]
+        elif (remaining > 0) != (position['size'] > 0):
+            # Flipped through zero: the remainder opens a fresh position at the fill price
+            self._cancel_position_triggers(position)
+            position.update(size=remaining, entry_price=price, opened_at=self.clock.time())
+        else:
+            position['size'] = remaining
+
+    def _cancel_position_triggers(self, position: Dict):
+        index = self.triggers.get(position['symbol'])
+        for key in ('stop_loss_id', 'take_profit_id'):
+            if position.get(key) and index is not None:
+                index.cancel(position[key])
+            position[key] = None
+
+    def _add_trigger(self, symbol: str, stop_order_type: str, trigger_price: float, position: Dict) -> str:
+        long = position['size'] > 0
+        rises = (stop_order_type == 'TakeProfit') == long
+        order = {
+            'order_id': self._next_order_id(),
+            'symbol': symbol,
+            'side': 'Sell' if long else 'Buy',
+            'trigger_price': trigger_price,
+            'trigger_direction': 'rise' if rises else 'fall',
+            'stop_order_type': stop_order_type,
+        }
+        self.triggers.setdefault(symbol, TriggerIndex()).add(order)
+        return order['order_id']
+
+    def _execute_conditional(self, order: Dict):
+        """Close the whole position at the trigger price (closeOnTrigger semantics)"""
+        position = self.positions.get(order['symbol'])
+        if position is None or order['order_id'] not in (position['stop_loss_id'], position['take_profit_id']):
+            return
+        price = self._fill_price(order['side'], order['trigger_price'])
+        self._fill(order['symbol'], order['side'], abs(position['size']), price, order['stop_order_type'])
+
+    def _unrealised_pnl(self, symbol: str, position: Dict) -> float:
+        price = self.last_prices.get(symbol, position['entry_price'])
+        return (price - position['entry_price']) * position['size']
+
+    def _used_margin(self) -> float:
+        return sum(
+            abs(p['size']) * p['entry_price'] / self.leverage.get(s, config.DEFAULT_LEVERAGE)
+            for s, p in self.positions.items()
+        )
+
+    # BybitClient interface
+
+    def get_account_balance(self) -> float:
+        """Total equity: wallet balance plus unrealised P&L"""
+        return self.wallet_balance + sum(self._unrealised_pnl(s, p) for s, p in self.positions.items())
+
+    def get_market_data(self, symbol: str, interval: str = '15', limit: int = 100) -> Optional[Dict]:
+        """Pass-through market data that also marks paper positions at the latest close"""
+        if self.market_data is None:
+            return None
+        market_data = self.market_data.get_market_data(symbol, interval, limit)
+        if market_data and market_data.get('list'):
+            # Bybit returns newest first
+            self.update_price(symbol, float(market_data['list'][0][4]))
+        return market_data
+
+    def set_leverage(self, symbol: str, leverage: int) -> bool:
+        self.leverage[symbol] = float(leverage)
+        return True
+
+    def place_order(self, symbol: str, side: str, qty: float,
+                    stop_loss: float, take_profit: float) -> Optional[Dict]:
+        """Fill a market order at the latest price and attach position SL/TP"""
+        price = self.latest_price(symbol)
+        if price is None or qty <= 0:
+            logger.error("Paper order rejected for %s: no price or invalid qty %s", symbol, qty,
+                         extra={'symbol': symbol})
+            return None
+
+        fill_price = self._fill_price(side, price)
+        existing = self.positions.get(symbol)
+        adding = existing is not None and (existing['size'] > 0) == (side == 'Buy')
+        if existing is None or adding:
+            leverage = self.leverage.get(symbol, config.DEFAULT_LEVERAGE)
+            required_margin = fill_price * qty / leverage
+            available = self.get_account_balance() - self._used_margin()
+            if required_margin > available:
+                logger.error("Paper order rejected for %s: margin %.2f > available %.2f",
+                             symbol, required_margin, available, extra={'symbol': symbol})
+                return None
+
+        order_id = self._next_order_id()
+        self._fill(symbol, side, qty, fill_price)
+
+        position = self.positions.get(symbol)
+        # An opposite order that only reduces the position leaves its SL/TP in place
+        if position is not None and (position['size'] > 0) == (side == 'Buy'):
+            self._cancel_position_triggers(position)
+            if adding:
+                # SL/TP were priced off this fill; keep their distance from the averaged entry
+                shift = position['entry_price'] / fill_price
+                stop_loss, take_profit = stop_loss and stop_loss * shift, take_profit and take_profit * shift
+            if stop_loss:
+                position['stop_loss_id'] = self._add_trigger(symbol, 'StopLoss', stop_loss, position)
+                position['stop_loss'] = stop_loss
+            if take_profit:
+                position['take_profit_id'] = self._add_trigger(symbol, 'TakeProfit', take_profit, position)
+                position['take_profit'] = take_profit
+
+        return {'orderId': order_id, 'orderLinkId': ''}
+
+    def get_open_positions(self) -> List[Dict]:
+        return [
+            {
+                'symbol': symbol,
+                'side': 'Buy' if p['size'] > 0 else 'Sell',
+                'size': str(abs(p['size'])),
+                'entryPrice': str(p['entry_price']),
+                'leverage': str(self.leverage.get(symbol, config.DEFAULT_LEVERAGE)),
+                'stopLoss': str(p.get('stop_loss', '')),
+                'takeProfit': str(p.get('take_profit', '')),
+                'unrealisedPnl': str(self._unrealised_pnl(symbol, p)),
+            }
+            for symbol, p in self.positions.items()
+        ]
+
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[Dict]:
+        """Resting conditional (SL/TP) orders"""
+        symbols = [symbol] if symbol else list(self.triggers)
+        return [o for s in symbols if s in self.triggers for o in self.triggers[s].orders()]
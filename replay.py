@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from config import config
+from clock import VirtualClock
+from paper_trading import PaperTradingClient
+from mock_bybit import ticker_from_klines
+from state_store import NullStateStore
+
+logger = logging.getLogger(__name__)
+
+CANDLE_WARMUP = 100  # scan_pair requests 100 candles
+
+
+class ReplayBybitClient(PaperTradingClient):
+    """Paper-trading client fed from stored candles on a virtual clock"""
+
+    def __init__(self, klines: Dict[str, List[List[str]]], clock: VirtualClock,
+                 balance: float = 10000.0, fee_rate: float = 0.00055, slippage: float = 0.0005):
+        super().__init__(balance=balance, fee_rate=fee_rate, slippage=slippage, clock=clock)
+
+        # Candles are stored oldest first; close_times[i] is when rows[i] completes
+        self.rows = klines
+        first = next(iter(klines.values()))
+        self.interval_ms = int(first[1][0]) - int(first[0][0])
+        self.close_times = {
+            symbol: [(int(row[0]) + self.interval_ms) / 1000 for row in rows]
+            for symbol, rows in klines.items()
+        }
+        self._processed = {symbol: 0 for symbol in klines}
+        self.fills: List[Dict] = []
+
+        clock.add_listener(self.on_clock)
+
+    @property
+    def start_time(self) -> float:
+        """Earliest time at which every symbol has CANDLE_WARMUP closed candles"""
+        return max(times[min(CANDLE_WARMUP, len(times)) - 1] for times in self.close_times.values())
+
+    @property
+    def end_time(self) -> float:
+        return min(times[-1] for times in self.close_times.values())
+
+    def _completed(self, symbol: str) -> int:
+        """Number of candles of symbol that have closed at the current virtual time"""
+        return bisect.bisect_right(self.close_times[symbol], self.clock.time())
+
+    def latest_price(self, symbol: str) -> Optional[float]:
+        if symbol not in self.rows:
+            return None
+        index = self._completed(symbol)
+        return float(self.rows[symbol][max(index - 1, 0)][4])
+
+    def on_clock(self, now: float):
+        """Feed every candle that closed since the last advance to symbols with open positions"""
+        for symbol in list(self.positions):
+            start = self._processed[symbol]
+            end = self._completed(symbol)
+            for row in self.rows[symbol][start:end]:
+                self.update_candle(symbol, float(row[2]), float(row[3]), float(row[4]))
+            self._processed[symbol] = end
+
+    def get_market_data(self, symbol: str, interval: str = '15', limit: int = 100) -> Optional[Dict]:
+        """Closed candles up to the virtual time, newest first like Bybit"""
+        if symbol not in self.rows:
+            return None
+        end = self._completed(symbol)
+        rows = self.rows[symbol][max(end - limit, 0):end]
+        if rows:
+            self.last_prices[symbol] = float(rows[-1][4])
+        return {'symbol': symbol, 'category': 'linear', 'list': rows[::-1]}
+
+    def get_tickers(self, category: str = 'linear') -> List[Dict]:
+        """24h stats of every stored symbol from candles closed by the virtual time"""
+        tickers = []
+        for symbol, rows in self.rows.items():
+            end = self._completed(symbol)
+            if end:
+                tickers.append(ticker_from_klines(symbol, rows[:end]))
+        return tickers
+
+    def place_order(self, symbol: str, side: str, qty: float,
+                    stop_loss: float, take_profit: float) -> Optional[Dict]:
+        # Only candles closing after the fill may trigger its SL/TP
+        if symbol in self.rows:
+            self._processed[symbol] = self._completed(symbol)
+        price = self.latest_price(symbol)
+        held = self.positions.get(symbol)
+        scale_in = held is not None and (held['size'] > 0) == (side == 'Buy')
+        result = super().place_order(symbol, side, qty, stop_loss, take_profit)
+        if result is not None and symbol in self.rows:
+            row = self.rows[symbol][max(self._completed(symbol) - 1, 0)]
+            self.fills.append({
+                'symbol': symbol, 'side': side, 'time': self.clock.time(),
+                'price': self._fill_price(side, price), 'high': float(row[2]), 'low': float(row[3]),
+                'scale_in': scale_in,
+            })
+        return result
+
+
+class StubCallbackQuery:
+    """Minimal CallbackQuery used to press an inline button offline"""
+
+    def __init__(self, data: str, message_id: int, owner: 'StubTelegramBot'):
+        self.data = data
+        self.message = SimpleNamespace(message_id=message_id)
+        self.owner = owner
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, text: str, *args, **kwargs):
+        await self.owner.edit_message_text(text, message_id=self.message.message_id)
+
+
+# A responder receives the alert text and its buttons and returns the callback_data to press:
+# a single value, a list for digests, or None
+Responder = Callable[[str, List], Union[None, str, List[str]]]
+
+
+class StubTelegramBot:
+    """Records outgoing messages and answers signal alerts automatically or from a script"""
+
+    def __init__(self, owner, responses: Union[str, Responder] = 'confirm'):
+        self.owner = owner
+        self.responses = responses
+        self.messages: List[Dict] = []
+        self.tasks: List[asyncio.Task] = []
+
+    def _choose(self, text: str, buttons: List) -> List[str]:
+        if callable(self.responses):
+            chosen = self.responses(text, buttons)
+            if chosen is None:
+                return []
+            return [chosen] if isinstance(chosen, str) else list(chosen)
+        if self.responses == 'ignore':
+            return []
+        prefix = 'confirm_' if self.responses == 'confirm' else 'cancel_'
+        return [button.callback_data for button in buttons if button.callback_data.startswith(prefix)]
+
+    async def send_message(self, chat_id, text: str, reply_markup=None, **kwargs):
+        message = {'chat_id': chat_id, 'text': text, 'sent_at': self.owner.clock.time(), 'edits': []}
+        self.messages.append(message)
+        message_id = len(self.messages)
+
+        if reply_markup is not None:
+            buttons = [button for row in reply_markup.inline_keyboard for button in row]
+            for data in self._choose(text, buttons):
+                # Press the button on the next loop iteration, as a real user would
+                self.tasks.append(asyncio.create_task(self._press(data, message_id)))
+        return SimpleNamespace(message_id=message_id, chat_id=chat_id)
+
+    async def edit_message_text(self, text: str, chat_id=None, message_id=None, **kwargs):
+        self.messages[message_id - 1]['edits'].append(text)
+
+    async def _press(self, data: str, message_id: int):
+        update = SimpleNamespace(
+            callback_query=StubCallbackQuery(data, message_id, self),
+            effective_chat=SimpleNamespace(id=config.ADMIN_CHAT_ID),
+        )
+        await self.owner.button_callback(update, None)
+
+
+class ReplayRunner:
+    """Drive the real TelegramBot scan/alert/trade flow over recorded candles on a virtual clock"""
+
+    def __init__(self, klines: Dict[str, List[List[str]]], scan_interval: Optional[int] = None,
+                 responses: Union[str, Responder] = 'confirm', balance: float = 10000.0,
+                 fee_rate: float = 0.00055, slippage: float = 0.0005, universe_size: int = 0,
+                 scan_mode: Optional[str] = None, poll_interval: Optional[float] = None):
+        from telegram_bot import TelegramBot
+        from universe import UniverseSelector
+        from scheduler import ScanScheduler
+
+        self.klines = klines
+        self.scan_interval = scan_interval or config.SCAN_INTERVAL
+        self.poll_interval = poll_interval or config.SCAN_POLL_INTERVAL
+        self.clock = VirtualClock()
+        self.client = ReplayBybitClient(klines, self.clock, balance, fee_rate, slippage)
+        self.clock.now = self.client.start_time
+        self.bot = TelegramBot(bybit_client=self.client, clock=self.clock, state_store=NullStateStore())
+        self.telegram = StubTelegramBot(self.bot, responses)
+        self.bot.application = SimpleNamespace(bot=self.telegram)
+        # Virtual time: deliver immediately; alerts of one sweep still share a digest
+        self.bot.outbox.rate_limit = 0
+        self.bot.outbox.coalesce_window = 0
+        if universe_size:
+            self.bot.universe = UniverseSelector(self.client, size=universe_size, min_turnover=0,
+                                                 clock=self.clock)
+        if scan_mode:
+            self.bot.scheduler = ScanScheduler(scan_mode, clock=self.clock)
+        self.sweeps = 0
+        # (alert price, fill) for every confirmed alert, checked by sanity_check()
+        self.alert_fills: List[Tuple[float, Dict]] = []
+        self.bot.add_trade_listener(self._on_trade)
+
+    def _on_trade(self, signal_data: Dict, account, order_result: Dict):
+        # Listeners run right after place_order, so the replay client's last fill is this order's
+        if account.client is self.client and self.client.fills:
+            self.alert_fills.append((signal_data['current_price'], self.client.fills[-1]))
+
+    def _on_clock(self, now: float):
+        self.sweeps += 1
+        if now >= self.client.end_time:
+            self.bot.is_scanning = False
+
+    def sanity_check(self) -> List[str]:
+        """Outcomes the real scan/alert/trade flow must never produce; any entry fails the replay"""
+        problems = []
+        for alert_price, fill in self.alert_fills:
+            tolerance = fill['high'] - fill['low'] + fill['price'] * self.client.slippage
+            if abs(fill['price'] - alert_price) > tolerance:
+                problems.append(f"{fill['symbol']} alert at {alert_price:.2f} filled at {fill['price']:.2f}, "
+                                f"outside the candle range {fill['low']:.2f}-{fill['high']:.2f}")
+        if not config.ALLOW_SCALE_IN:
+            for fill in self.client.fills:
+                if fill['scale_in']:
+                    problems.append(f"{fill['symbol']} {fill['side']} added to an open position "
+                                    f"at {fill['price']:.2f} with ALLOW_SCALE_IN off")
+
+        for account in self.bot.accounts.values():
+            if not account.is_paper:
+                continue
+            for trade in account.client.closed_trades:
+                label = f"{account.name} {trade['symbol']} {trade['side']} {trade['reason']}"
+                if trade['reason'] == 'StopLoss' and trade['pnl'] > 0:
+                    problems.append(f"{label} exit was profitable ({trade['pnl']:+.2f})")
+                if trade['reason'] == 'TakeProfit' and trade['pnl'] < 0:
+                    problems.append(f"{label} exit lost money ({trade['pnl']:+.2f})")
+                if trade['reason'] in ('StopLoss', 'TakeProfit') and trade['closed_at'] <= trade['opened_at']:
+                    problems.append(f"{label} exit triggered at entry time")
+        return problems
+
+    async def run(self) -> Dict:
+        """Replay the whole dataset and return a report"""
+        saved = (config.SCAN_INTERVAL, config.SCAN_POLL_INTERVAL, config.ADMIN_CHAT_ID)
+        self.bot.market_data.symbols = list(self.klines)
+        config.SCAN_INTERVAL = self.scan_interval
+        config.SCAN_POLL_INTERVAL = self.poll_interval
+        config.ADMIN_CHAT_ID = config.ADMIN_CHAT_ID or 'replay'
+        self.clock.add_listener(self._on_clock)
+
+        start_time = self.clock.time()
+        wall_start = time.perf_counter()
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                self.bot.ml_model.model_path = os.path.join(tmp, 'signal_model.pkl')
+                self.bot.ml_model.scaler_path = os.path.join(tmp, 'signal_scaler.pkl')
+                self.bot.ml_model.forest_path = os.path.join(tmp, 'signal_model.forest')
+                await self.bot.start_scanning()
+                while len(self.bot.outbox) or any(not task.done() for task in self.telegram.tasks):
+                    await self.bot.outbox.drain()
+                    await asyncio.gather(*self.telegram.tasks)
+                await self.bot.outbox.close()
+        finally:
+            config.SCAN_INTERVAL, config.SCAN_POLL_INTERVAL, config.ADMIN_CHAT_ID = saved
+        wall = time.perf_counter() - wall_start
+        virtual = self.clock.time() - start_time
+
+        return {
+            'pairs': len(self.klines),
+            'virtual_seconds': virtual,
+            'wall_seconds': wall,
+            'speedup': virtual / wall if wall else 0.0,
+            'sweeps': self.sweeps,
+            'alerts': len(self.telegram.messages),
+            'accounts': {
+                account.name: {
+                    'closed_trades': len(account.client.closed_trades),
+                    'open_positions': len(account.client.positions),
+                    'fees_paid': account.client.fees_paid,
+                    'final_equity': account.client.get_account_balance(),
+                }
+                for account in self.bot.accounts.values() if account.is_paper
+            },
+            'market_data': self.bot.market_data.stats(),
+            'universe': self.bot.universe.symbols if self.bot.universe else None,
+            'scheduler': self.bot.scheduler.stats(),
+            'outbox': self.bot.outbox.stats(),
+            'latency': self.bot.metrics.summary(),
+            'sanity': self.sanity_check(),
+        }
+
+
+def main():
+    from mock_bybit import load_kline_fixtures, generate_kline_fixtures
+
+    parser = argparse.ArgumentParser(description="Replay recorded markets through TelegramBot offline")
+    parser.add_argument('--data', help="Kline JSON {symbol: rows oldest first}; synthetic data if omitted")
+    parser.add_argument('--pairs', type=int, default=50, help="Number of synthetic pairs")
+    parser.add_argument('--days', type=float, default=7, help="Days of synthetic 15m candles")
+    parser.add_argument('--scan-interval', type=int, default=None, help="Virtual seconds between sweeps")
+    parser.add_argument('--responses', choices=['confirm', 'cancel', 'ignore'], default='confirm')
+    parser.add_argument('--balance', type=float, default=10000.0)
+    parser.add_argument('--universe', type=int, default=0, help="Scan only the top N pairs by ticker ranking")
+    parser.add_argument('--scan-mode', choices=['fixed', 'adaptive'], default=None,
+                        help="fixed: every pair each sweep; adaptive: on candle close and large moves")
+    parser.add_argument('--poll-interval', type=float, default=None, help="Virtual seconds between adaptive ticks")
+    parser.add_argument('--output', help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.data:
+        klines = load_kline_fixtures(args.data)
+    else:
+        symbols = [f"PAIR{i:03d}USDT" for i in range(args.pairs)]
+        klines = generate_kline_fixtures(symbols, int(args.days * 96) + CANDLE_WARMUP)
+
+    runner = ReplayRunner(klines, args.scan_interval, args.responses, args.balance,
+                          universe_size=args.universe, scan_mode=args.scan_mode,
+                          poll_interval=args.poll_interval)
+    report = asyncio.run(runner.run())
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    for problem in report['sanity']:
+        print(f"SANITY {problem}", file=sys.stderr)
+    if report['sanity']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
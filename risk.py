@@ -0,0 +1,190 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+from clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+MIN_CORRELATION_SAMPLES = 10
+
+
+class ReturnCorrelation:
+    """Rolling correlation of candle returns across the scanned symbols.
+
+    Returns are stored as closes arrive; the matrix is rebuilt once per sweep
+    by refresh(), so pre-trade checks only read a cached array.
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = config.RISK_CORRELATION_WINDOW if window is None else window
+        self._returns: Dict[str, np.ndarray] = {}
+        self._index: Dict[str, int] = {}
+        self._matrix = np.zeros((0, 0))
+        self._dirty = False
+
+    def update(self, symbol: str, prices: List[float]):
+        closes = np.asarray(prices[-(self.window + 1):], dtype=float)
+        if len(closes) <= MIN_CORRELATION_SAMPLES or np.any(closes <= 0):
+            return
+        self._returns[symbol] = np.diff(np.log(closes))
+        self._dirty = True
+
+    def forget(self, symbol: str):
+        if self._returns.pop(symbol, None) is not None:
+            self._dirty = True
+
+    def refresh(self):
+        """Rebuild the correlation matrix if any returns changed"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        symbols = sorted(self._returns)
+        if not symbols:
+            self._index, self._matrix = {}, np.zeros((0, 0))
+            return
+
+        length = min(len(self._returns[s]) for s in symbols)
+        returns = np.vstack([self._returns[s][-length:] for s in symbols])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matrix = np.atleast_2d(np.corrcoef(returns))
+        # Flat series have undefined correlation; treat them as independent
+        matrix = np.nan_to_num(matrix, nan=0.0)
+        np.fill_diagonal(matrix, 1.0)
+        self._index = {s: i for i, s in enumerate(symbols)}
+        self._matrix = matrix
+
+    def correlation(self, a: str, b: str) -> Optional[float]:
+        i, j = self._index.get(a), self._index.get(b)
+        return None if i is None or j is None else float(self._matrix[i, j])
+
+    def adjusted_notional(self, exposures: Dict[str, float]) -> float:
+        """sqrt(w' C w) over signed notionals; symbols without history count at full size"""
+        if self._dirty and not self._index:
+            self.refresh()
+        weights = np.zeros(len(self._index))
+        unknown = 0.0
+        for symbol, notional in exposures.items():
+            i = self._index.get(symbol)
+            if i is None:
+                unknown += abs(notional)
+            else:
+                weights[i] += notional
+        variance = float(weights @ self._matrix @ weights) if len(weights) else 0.0
+        return float(np.sqrt(max(variance, 0.0))) + unknown
+
+
+class RiskEngine:
+    """Pre-trade limits for one account over an incrementally maintained exposure view.
+
+    Exposure is kept as signed quantity and last price per symbol and updated
+    on fills and price marks; periodic syncs against the exchange pick up
+    positions closed by SL/TP. Limits left as None fall back to config and
+    0 disables a limit.
+    """
+
+    def __init__(self, correlation: Optional[ReturnCorrelation] = None, max_notional: Optional[float] = None,
+                 max_positions: Optional[int] = None, max_correlated_notional: Optional[float] = None,
+                 sync_interval: Optional[float] = None, clock=None):
+        self.correlation = correlation
+        self.max_notional = config.MAX_TOTAL_NOTIONAL if max_notional is None else max_notional
+        self.max_positions = config.MAX_OPEN_POSITIONS if max_positions is None else max_positions
+        self.max_correlated_notional = (config.MAX_CORRELATED_NOTIONAL if max_correlated_notional is None
+                                        else max_correlated_notional)
+        self.sync_interval = config.RISK_SYNC_INTERVAL if sync_interval is None else sync_interval
+        self.clock = clock or SystemClock()
+        self.positions: Dict[str, Tuple[float, float]] = {}  # symbol -> (signed qty, last price)
+        self.gross_notional = 0.0
+        self.last_sync: Optional[float] = None
+        self.rejections = 0
+
+    # Exposure updates
+
+    def _set(self, symbol: str, qty: float, price: float):
+        old = self.positions.get(symbol)
+        if old is not None:
+            self.gross_notional -= abs(old[0] * old[1])
+        if abs(qty) < 1e-12:
+            self.positions.pop(symbol, None)
+        else:
+            self.positions[symbol] = (qty, price)
+            self.gross_notional += abs(qty * price)
+
+    def mark(self, symbol: str, price: float):
+        position = self.positions.get(symbol)
+        if position is not None:
+            self._set(symbol, position[0], price)
+
+    def on_fill(self, symbol: str, side: str, qty: float, price: float):
+        current = self.positions.get(symbol, (0.0, price))[0]
+        self._set(symbol, current + (qty if side == 'Buy' else -qty), price)
+
+    def sync(self, positions: Optional[List[Dict]]):
+        """Replace the exposure view with the exchange's open positions.
+
+        None (the fetch failed) keeps the current view; the next attempt
+        waits a full sync interval either way.
+        """
+        if positions is None:
+            self.last_sync = self.clock.time()
+            return
+        self.positions.clear()
+        self.gross_notional = 0.0
+        for pos in positions:
+            size = float(pos.get('size') or 0)
+            if size <= 0:
+                continue
+            price = float(pos.get('markPrice') or pos.get('avgPrice') or pos.get('entryPrice') or 0)
+            self._set(pos['symbol'], size if pos.get('side') == 'Buy' else -size, price)
+        self.last_sync = self.clock.time()
+
+    def sync_due(self) -> bool:
+        return self.last_sync is None or self.clock.time() - self.last_sync >= self.sync_interval
+
+    # Checks
+
+    def exposures(self) -> Dict[str, float]:
+        return {symbol: qty * price for symbol, (qty, price) in self.positions.items()}
+
+    def check(self, symbol: str, side: str, qty: float, price: float) -> Optional[str]:
+        """Reason the order would breach a limit, or None if it may be placed.
+
+        Orders that reduce the measured exposure are always allowed.
+        """
+        exposures = self.exposures()
+        before = exposures.get(symbol, 0.0)
+        after = before + (qty if side == 'Buy' else -qty) * price
+        exposures[symbol] = after
+
+        if self.max_positions and before == 0 and len(self.positions) >= self.max_positions:
+            return self._reject(f"max open positions reached ({len(self.positions)}/{self.max_positions})")
+
+        gross_after = self.gross_notional - abs(before) + abs(after)
+        if self.max_notional and gross_after > self.max_notional and gross_after > self.gross_notional:
+            return self._reject(f"total notional ${gross_after:,.0f} exceeds ${self.max_notional:,.0f}")
+
+        if self.max_correlated_notional and self.correlation is not None:
+            adjusted_after = self.correlation.adjusted_notional(exposures)
+            if adjusted_after > self.max_correlated_notional:
+                exposures[symbol] = before
+                if adjusted_after > self.correlation.adjusted_notional(exposures):
+                    return self._reject(
+                        f"correlated exposure ${adjusted_after:,.0f} exceeds ${self.max_correlated_notional:,.0f}"
+                    )
+        return None
+
+    def _reject(self, reason: str) -> str:
+        self.rejections += 1
+        return reason
+
+    def summary(self) -> Dict[str, float]:
+        exposures = self.exposures()
+        return {
+            'positions': len(self.positions),
+            'gross_notional': self.gross_notional,
+            'net_notional': sum(exposures.values()),
+            'correlated_notional': self.correlation.adjusted_notional(exposures) if self.correlation else 0.0,
+            'rejections': self.rejections,
+        }
@@ -0,0 +1,171 @@
+import logging
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+from clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+CANDLE_SECONDS = 15 * 60  # scan_pair evaluates 15m klines
+VOLATILITY_WINDOW = 20  # candle returns behind the move threshold
+
+REASON_NEW = 'new'
+REASON_CLOSE = 'close'
+REASON_MOVE = 'move'
+REASON_INTERVAL = 'interval'
+
+
+class SymbolSchedule:
+    """Scheduling state and evaluation counters of one symbol"""
+
+    def __init__(self, now: float):
+        self.first_seen = now
+        self.candle: Optional[int] = None  # candle index of the last evaluation
+        self.reference: Optional[float] = None  # price the move threshold is measured from
+        self.threshold: Optional[float] = None  # relative move that triggers an evaluation
+        self.fingerprint: Optional[tuple] = None
+        self.evaluations = 0
+        self.skipped = 0
+        self.triggers: Dict[str, int] = {}
+
+
+class ScanScheduler:
+    """Decides which symbols to evaluate on each scheduler tick.
+
+    In 'adaptive' mode a symbol is due once per candle, shortly after the
+    close, and in between only when its price has moved more than
+    `move_sigma` candle standard deviations (at least `min_move`) from the
+    price at its last evaluation. Evaluations whose klines are unchanged
+    are skipped. In 'fixed' mode every symbol is due on every tick, as
+    with the plain SCAN_INTERVAL loop.
+    """
+
+    def __init__(self, mode: Optional[str] = None, candle_seconds: int = CANDLE_SECONDS,
+                 close_delay: Optional[float] = None, move_sigma: Optional[float] = None,
+                 min_move: Optional[float] = None, clock=None):
+        self.mode = config.SCAN_MODE if mode is None else mode
+        if self.mode not in ('fixed', 'adaptive'):
+            raise ValueError(f"unknown scan mode {self.mode!r}")
+        self.candle_seconds = candle_seconds
+        self.close_delay = config.SCAN_CLOSE_DELAY if close_delay is None else close_delay
+        self.move_sigma = config.SCAN_MOVE_SIGMA if move_sigma is None else move_sigma
+        self.min_move = config.SCAN_MIN_MOVE if min_move is None else min_move
+        self.clock = clock or SystemClock()
+        self.symbols: Dict[str, SymbolSchedule] = {}
+
+    @property
+    def adaptive(self) -> bool:
+        return self.mode == 'adaptive'
+
+    @property
+    def tick_interval(self) -> float:
+        return config.SCAN_POLL_INTERVAL if self.adaptive else config.SCAN_INTERVAL
+
+    def _state(self, symbol: str) -> SymbolSchedule:
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = SymbolSchedule(self.clock.time())
+        return state
+
+    def _candle(self) -> int:
+        return int((self.clock.time() - self.close_delay) // self.candle_seconds)
+
+    def due(self, symbols: Iterable[str], prices: Optional[Dict[str, float]] = None) -> List[Tuple[str, str]]:
+        """(symbol, reason) pairs to evaluate now; prices are current prices where known"""
+        prices = prices or {}
+        candle = self._candle()
+        due = []
+        for symbol in symbols:
+            state = self._state(symbol)
+            price = prices.get(symbol)
+            if not self.adaptive:
+                reason = REASON_INTERVAL
+            elif state.candle is None:
+                reason = REASON_NEW
+            elif candle > state.candle:
+                reason = REASON_CLOSE
+            elif price is None or state.threshold is None:
+                continue
+            elif state.reference is None:
+                # First price seen since the last evaluation
+                state.reference = price
+                continue
+            elif abs(math.log(price / state.reference)) > state.threshold:
+                reason = REASON_MOVE
+            else:
+                continue
+
+            state.candle = candle
+            state.reference = price
+            state.triggers[reason] = state.triggers.get(reason, 0) + 1
+            due.append((symbol, reason))
+        return due
+
+    def needs_prices(self, symbols: Iterable[str]) -> bool:
+        """Whether any symbol is waiting on an intra-candle move"""
+        return self.adaptive and any(
+            symbol in self.symbols and self.symbols[symbol].threshold is not None for symbol in symbols
+        )
+
+    def record(self, symbol: str, fingerprint: tuple, prices: List[float], volatile: bool = False) -> bool:
+        """Note an evaluation's inputs; False if they match the previous ones and it can be skipped.
+
+        `prices` are closes oldest first; the move threshold follows the
+        latest VOLATILITY_WINDOW returns. `volatile` inputs (e.g. live
+        order-book features) are never skipped.
+        """
+        state = self._state(symbol)
+        if self.adaptive and not volatile and fingerprint == state.fingerprint:
+            state.skipped += 1
+            return False
+
+        state.fingerprint = fingerprint
+        state.evaluations += 1
+        closes = np.asarray(prices[-(VOLATILITY_WINDOW + 1):], dtype=float)
+        if len(closes) > 2 and np.all(closes > 0):
+            sigma = float(np.std(np.diff(np.log(closes))))
+            state.threshold = max(self.move_sigma * sigma, self.min_move)
+        return True
+
+    def forget(self, symbol: str):
+        self.symbols.pop(symbol, None)
+
+    def rates(self) -> Dict[str, float]:
+        """Evaluations per hour for each symbol since it was first scheduled"""
+        now = self.clock.time()
+        return {
+            symbol: state.evaluations * 3600 / max(now - state.first_seen, self.candle_seconds)
+            for symbol, state in self.symbols.items()
+        }
+
+    def stats(self) -> Dict:
+        rates = self.rates()
+        return {
+            'mode': self.mode,
+            'evaluations': sum(s.evaluations for s in self.symbols.values()),
+            'skipped_unchanged': sum(s.skipped for s in self.symbols.values()),
+            'evaluations_per_hour': sum(rates.values()),
+            'symbols': {
+                symbol: {
+                    'evaluations': state.evaluations,
+                    'skipped': state.skipped,
+                    'per_hour': rates[symbol],
+                    'triggers': dict(state.triggers),
+                    'move_threshold': state.threshold,
+                }
+                for symbol, state in sorted(self.symbols.items())
+            },
+        }
+
+    def format_summary(self, top: int = 5) -> str:
+        """One status line with the busiest symbols"""
+        rates = self.rates()
+        busiest = sorted(rates.items(), key=lambda item: -item[1])[:top]
+        line = (f"Scheduling: {self.mode}, {sum(rates.values()):.0f} evals/h over {len(rates)} pairs, "
+                f"{sum(s.skipped for s in self.symbols.values())} unchanged skipped")
+        if busiest:
+            line += "\nBusiest: " + ", ".join(f"{symbol} {rate:.1f}/h" for symbol, rate in busiest)
+        return line
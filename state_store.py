@@ -0,0 +1,164 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID
+"""
+
+_STOP = object()
+
+
+class StateStore:
+    """Embedded SQLite (WAL) store for bot state that must survive restarts.
+
+    Writes are queued and applied in batches by a background thread, so
+    callers on the event loop never wait on disk. Reads are only done at
+    startup. Expired rows are purged and the WAL truncated periodically.
+    """
+
+    def __init__(self, path: str, compact_interval: float = 300.0, batch_size: int = 500):
+        self.path = path
+        self.compact_interval = compact_interval
+        self.batch_size = batch_size
+        self.writes = 0
+        self.compactions = 0
+
+        conn = self._connect()
+        conn.execute(_SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name='state-writer', daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA journal_size_limit=1048576')
+        return conn
+
+    # Reads (startup only)
+
+    def load(self, namespace: str) -> Dict[str, Tuple[Any, Optional[float]]]:
+        """All rows of a namespace as {key: (value, expires_at)}"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT key, value, expires_at FROM state WHERE namespace = ?', (namespace,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {key: (json.loads(value), expires_at) for key, value, expires_at in rows}
+
+    def get(self, namespace: str, key: str, default=None):
+        row = self.load(namespace).get(key)
+        return default if row is None else row[0]
+
+    # Writes (asynchronous)
+
+    def put(self, namespace: str, key: str, value: Any, expires_at: Optional[float] = None):
+        self._queue.put(('put', namespace, key, json.dumps(value, default=float), expires_at))
+
+    def delete(self, namespace: str, key: str):
+        self._queue.put(('delete', namespace, key, None, None))
+
+    def flush(self, timeout: float = 5.0):
+        """Block until all queued writes are on disk"""
+        done = threading.Event()
+        self._queue.put(('flush', done, None, None, None))
+        done.wait(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5.0)
+
+    def _writer(self):
+        conn = self._connect()
+        last_compaction = time.monotonic()
+        stop = False
+
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            flushed = []
+            try:
+                with conn:
+                    for op in batch:
+                        if op is _STOP:
+                            stop = True
+                            continue
+                        kind, namespace, key, value, expires_at = op
+                        if kind == 'put':
+                            conn.execute(
+                                'INSERT OR REPLACE INTO state (namespace, key, value, expires_at) '
+                                'VALUES (?, ?, ?, ?)', (namespace, key, value, expires_at)
+                            )
+                            self.writes += 1
+                        elif kind == 'delete':
+                            conn.execute('DELETE FROM state WHERE namespace = ? AND key = ?', (namespace, key))
+                            self.writes += 1
+                        elif kind == 'flush':
+                            flushed.append(namespace)
+            except sqlite3.Error as e:
+                logger.error("State write failed: %s", e)
+
+            if stop or time.monotonic() - last_compaction >= self.compact_interval:
+                self._compact(conn)
+                last_compaction = time.monotonic()
+
+            for done in flushed:
+                done.set()
+
+        conn.close()
+
+    def _compact(self, conn: sqlite3.Connection):
+        """Purge expired rows and truncate the WAL so the files stay small"""
+        try:
+            with conn:
+                conn.execute('DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),))
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.compactions += 1
+        except sqlite3.Error as e:
+            logger.error("State compaction failed: %s", e)
+
+
+class NullStateStore:
+    """No-op store used when persistence is disabled (replay, benchmarks)"""
+
+    def load(self, namespace: str) -> Dict[str, Tuple[Any, Optional[float]]]:
+        return {}
+
+    def get(self, namespace: str, key: str, default=None):
+        return default
+
+    def put(self, namespace: str, key: str, value: Any, expires_at: Optional[float] = None):
+        pass
+
+    def delete(self, namespace: str, key: str):
+        pass
+
+    def flush(self, timeout: float = 5.0):
+        pass
+
+    def close(self):
+        pass
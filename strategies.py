@@ -1,16 +1,36 @@
-import pandas as pd
 import numpy as np
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 class TradingStrategies:
+    # Tunable thresholds (see optimizer.py); override with configure() or STRATEGY_PARAMS
+    RSI_OVERSOLD = 30.0
+    RSI_OVERBOUGHT = 70.0
+    EMA_FAST = 9
+    EMA_SLOW = 21
+    TREND_FAST = 20
+    TREND_SLOW = 50
+    BREAKOUT_BAND = 0.02
+    BOLLINGER_K = 2.0
+    MIN_VOTES = 3
+    ORDER_FLOW_THRESHOLD = 0.3
+    
+    @classmethod
+    def configure(cls, params: Dict):
+        """Set thresholds from a {name: value} dict using optimizer parameter names"""
+        for name, value in params.items():
+            attribute = name.upper()
+            if not hasattr(cls, attribute):
+                raise ValueError(f"Unknown strategy parameter: {name}")
+            setattr(cls, attribute, type(getattr(cls, attribute))(value))
+    
     @staticmethod
     def calculate_rsi(prices: List[float], period: int = 14) -> float:
-        """Calculate RSI indicator"""
+        """Calculate RSI indicator over the last `period` price changes"""
         deltas = np.diff(prices)
-        seed = deltas[:period+1]
+        seed = deltas[-period:]
         up = seed[seed >= 0].sum() / period
         down = -seed[seed < 0].sum() / period
         
@@ -46,24 +66,26 @@ class TradingStrategies:
             return "HOLD", 0.0
         
         rsi = TradingStrategies.calculate_rsi(prices)
+        oversold = TradingStrategies.RSI_OVERSOLD
+        overbought = TradingStrategies.RSI_OVERBOUGHT
         
-        if rsi < 30:
-            confidence = (30 - rsi) / 30  # Normalize to 0-1
+        if rsi < oversold:
+            confidence = (oversold - rsi) / oversold  # Normalize to 0-1
             return "BUY", confidence
-        elif rsi > 70:
-            confidence = (rsi - 70) / 30
+        elif rsi > overbought:
+            confidence = (rsi - overbought) / (100 - overbought)
             return "SELL", confidence
         else:
             return "HOLD", 0.0
     
     @staticmethod
     def ema_crossover_strategy(prices: List[float]) -> Tuple[str, float]:
-        """EMA Crossover Strategy (9 & 21 period)"""
-        if len(prices) < 22:
+        """EMA Crossover Strategy (9 & 21 period by default)"""
+        if len(prices) < TradingStrategies.EMA_SLOW + 1:
             return "HOLD", 0.0
         
-        ema_9 = TradingStrategies.calculate_ema(prices, 9)
-        ema_21 = TradingStrategies.calculate_ema(prices, 21)
+        ema_9 = TradingStrategies.calculate_ema(prices, TradingStrategies.EMA_FAST)
+        ema_21 = TradingStrategies.calculate_ema(prices, TradingStrategies.EMA_SLOW)
         
         if len(ema_9) < 2 or len(ema_21) < 2:
             return "HOLD", 0.0
@@ -74,7 +96,7 @@ class TradingStrategies:
         ema_21_current = ema_21[-1]
         ema_21_prev = ema_21[-2]
         
-        if pd.isna(ema_9_current) or pd.isna(ema_21_current):
+        if np.isnan(ema_9_current) or np.isnan(ema_21_current):
             return "HOLD", 0.0
         
         # Check for crossover
@@ -103,12 +125,13 @@ class TradingStrategies:
         resistance = max(recent_prices[:15])
         support = min(recent_prices[:15])
         
-        # Check for breakout
-        if current_price > resistance * 1.02:  # 2% above resistance
+        # Check for breakout (2% beyond the range by default)
+        band = TradingStrategies.BREAKOUT_BAND
+        if current_price > resistance * (1 + band):
             breakout_strength = (current_price - resistance) / resistance
             confidence = min(0.4 + breakout_strength * 20, 0.85)
             return "BUY", confidence
-        elif current_price < support * 0.98:  # 2% below support
+        elif current_price < support * (1 - band):
             breakdown_strength = (support - current_price) / support
             confidence = min(0.4 + breakdown_strength * 20, 0.85)
             return "SELL", confidence
@@ -118,11 +141,11 @@ class TradingStrategies:
     @staticmethod
     def trend_following_strategy(prices: List[float]) -> Tuple[str, float]:
         """Trend Following using multiple EMAs"""
-        if len(prices) < 50:
+        if len(prices) < TradingStrategies.TREND_SLOW:
             return "HOLD", 0.0
         
-        ema_20 = TradingStrategies.calculate_ema(prices, 20)
-        ema_50 = TradingStrategies.calculate_ema(prices, 50)
+        ema_20 = TradingStrategies.calculate_ema(prices, TradingStrategies.TREND_FAST)
+        ema_50 = TradingStrategies.calculate_ema(prices, TradingStrategies.TREND_SLOW)
         
         if len(ema_20) < 2 or len(ema_50) < 2:
             return "HOLD", 0.0
@@ -130,7 +153,7 @@ class TradingStrategies:
         ema_20_current = ema_20[-1]
         ema_50_current = ema_50[-1]
         
-        if pd.isna(ema_20_current) or pd.isna(ema_50_current):
+        if np.isnan(ema_20_current) or np.isnan(ema_50_current):
             return "HOLD", 0.0
         
         price_trend = np.polyfit(range(len(prices[-10:])), prices[-10:], 1)[0]
@@ -158,8 +181,8 @@ class TradingStrategies:
         sma = np.mean(recent_prices)
         std = np.std(recent_prices)
         
-        upper_band = sma + (2 * std)
-        lower_band = sma - (2 * std)
+        upper_band = sma + (TradingStrategies.BOLLINGER_K * std)
+        lower_band = sma - (TradingStrategies.BOLLINGER_K * std)
         
         if current_price < lower_band:
             deviation = (lower_band - current_price) / lower_band
@@ -173,7 +196,19 @@ class TradingStrategies:
         return "HOLD", 0.0
     
     @staticmethod
-    def analyze_all_strategies(prices: List[float]) -> Dict:
+    def order_flow_strategy(microstructure: Dict) -> Tuple[str, float]:
+        """Order-book and trade-flow pressure (features from orderbook.MicrostructureFeed)"""
+        pressure = (microstructure['avg_book_imbalance'] + microstructure['trade_flow_imbalance']) / 2
+        
+        if pressure > TradingStrategies.ORDER_FLOW_THRESHOLD:
+            return "BUY", min(pressure, 1.0)
+        elif pressure < -TradingStrategies.ORDER_FLOW_THRESHOLD:
+            return "SELL", min(-pressure, 1.0)
+        
+        return "HOLD", 0.0
+    
+    @staticmethod
+    def analyze_all_strategies(prices: List[float], microstructure: Optional[Dict] = None) -> Dict:
         """Run all strategies and aggregate results"""
         strategies = {
             'RSI': TradingStrategies.rsi_strategy,
@@ -199,14 +234,25 @@ class TradingStrategies:
                 sell_signals += 1
                 total_confidence += confidence
         
+        # Order flow votes only when streamed book/trade data is available
+        if microstructure is not None:
+            signal, confidence = TradingStrategies.order_flow_strategy(microstructure)
+            results['ORDER_FLOW'] = {'signal': signal, 'confidence': confidence}
+            if signal == 'BUY':
+                buy_signals += 1
+                total_confidence += confidence
+            elif signal == 'SELL':
+                sell_signals += 1
+                total_confidence += confidence
+        
         # Determine final signal based on majority
         final_signal = "HOLD"
         avg_confidence = 0.0
         
-        if buy_signals > sell_signals and buy_signals >= 3:
+        if buy_signals > sell_signals and buy_signals >= TradingStrategies.MIN_VOTES:
             final_signal = "BUY"
             avg_confidence = total_confidence / buy_signals if buy_signals > 0 else 0
-        elif sell_signals > buy_signals and sell_signals >= 3:
+        elif sell_signals > buy_signals and sell_signals >= TradingStrategies.MIN_VOTES:
             final_signal = "SELL"
             avg_confidence = total_confidence / sell_signals if sell_signals > 0 else 0
         
@@ -5,24 +5,130 @@ from telegram.ext import (
 )
 import asyncio
 import logging
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Iterable, List, Tuple
+import itertools
+import json
 import time
 
 from config import config
-from strategies import TradingStrategies
 from ml_model import SignalConfidenceModel
+from strategies import TradingStrategies
 from bybit_client import BybitClient
+from accounts import TradingAccount, build_accounts
+from market_data import SharedMarketData, kline_fingerprint
+from risk import ReturnCorrelation
+from orderbook import MicrostructureFeed, BybitPublicStream
+from universe import UniverseSelector
+from scheduler import ScanScheduler
+from clock import SystemClock
+from metrics import LatencyRecorder
+from expiring_store import ExpiringStore
+from state_store import StateStore, NullStateStore
+from outbox import TelegramOutbox, OutboxReply, PRIORITY_UPDATE
 
 logger = logging.getLogger(__name__)
 
 class TelegramBot:
-    def __init__(self):
+    def __init__(self, bybit_client=None, clock=None, state_store=None):
         self.application = None
-        self.bybit_client = BybitClient()
+        self.clock = clock or SystemClock()
+        if config.STRATEGY_PARAMS:
+            self.apply_strategy_params(config.STRATEGY_PARAMS)
+        
+        # One market-data feed and indicator cache shared by every account
+        self.market_data = SharedMarketData(bybit_client or BybitClient(), clock=self.clock)
+        self.correlation = ReturnCorrelation()
+        # Order-book / trade-flow state, filled by the optional public stream
+        self.microstructure = MicrostructureFeed()
+        self.public_stream = None
+        self._stream_task = None
+        # Optional top-N universe from bulk tickers; accounts without explicit pairs follow it
+        self.universe = (UniverseSelector(self.market_data.client, clock=self.clock)
+                         if config.UNIVERSE_SIZE > 0 else None)
+        # Which pairs each tick evaluates: all of them, or only on candle close / large moves
+        self.scheduler = ScanScheduler(clock=self.clock)
+        self.accounts = build_accounts(self.market_data, default_client=bybit_client,
+                                       correlation=self.correlation, clock=self.clock)
+        self.metrics = LatencyRecorder()
+        self._trade_listeners: List[Callable[[Dict, TradingAccount, Dict], None]] = []
         self.ml_model = SignalConfidenceModel()
-        self.pending_signals = {}
-        self.last_signals = {}
+        # One entry per alert; both buttons carry the same alert id
+        self.pending_signals = ExpiringStore(config.SIGNAL_TTL, config.MAX_PENDING_SIGNALS, self.clock)
+        self.last_signals = ExpiringStore(config.SIGNAL_DEDUPE_WINDOW, config.MAX_TRACKED_SIGNALS, self.clock)
+        self._alert_ids = itertools.count(int(self.clock.time() * 1000))
         self.is_scanning = False
+        
+        # Persisted state survives restarts; restored before anything else runs
+        if state_store is None:
+            state_store = StateStore(config.STATE_DB_PATH) if config.STATE_DB_PATH else NullStateStore()
+        self.state = state_store
+        self.resume_scanning = False
+        self.restore_state()
+        
+        # Outbound messages are queued so scanning never waits on Telegram
+        self.outbox = TelegramOutbox(lambda: self.application.bot, self._deliver_alert_batch, self.metrics)
+    
+    @staticmethod
+    def apply_strategy_params(raw: str):
+        """Apply thresholds saved by optimizer.py --save-params (inline JSON or a file path)"""
+        raw = raw.strip()
+        if not raw.startswith('{'):
+            with open(raw) as f:
+                raw = f.read()
+        params = json.loads(raw)
+        if 'min_confidence' in params:
+            config.MIN_CONFIDENCE = float(params.pop('min_confidence'))
+        TradingStrategies.configure(params)
+        logger.info("Strategy thresholds loaded: %s", params)
+    
+    @property
+    def bybit_client(self):
+        """Execution client of the first (default) account"""
+        return next(iter(self.accounts.values())).client
+    
+    def restore_state(self):
+        """Reload settings, pending alerts, dedupe keys and the scanning flag"""
+        start = time.perf_counter()
+        
+        for name, (settings, _) in self.state.load('settings').items():
+            account = self.accounts.get(name)
+            if account:
+                account.leverage = settings['leverage']
+                account.risk_percentage = settings['risk_percentage']
+        
+        # Expired alerts are restored too so the next sweep marks their messages expired
+        pending = self.state.load('pending')
+        for alert_id, (signal, expires_at) in pending.items():
+            for old_alert_id, _ in self.pending_signals.restore(alert_id, signal, expires_at):
+                self.state.delete('pending', old_alert_id)
+        
+        for key, (timestamp, expires_at) in self.state.load('dedupe').items():
+            if expires_at > self.clock.time():
+                for old_key, _ in self.last_signals.restore(key, timestamp, expires_at):
+                    self.state.delete('dedupe', old_key)
+        
+        self.resume_scanning = bool(self.state.get('runtime', 'scanning', False))
+        
+        if pending or self.resume_scanning:
+            logger.info(
+                "♻️ State restored in %.1fms: %d pending alerts, %d recent signals, scanning=%s",
+                (time.perf_counter() - start) * 1000, len(pending), len(self.last_signals),
+                'on' if self.resume_scanning else 'off'
+            )
+    
+    def _save_account_settings(self, account: TradingAccount):
+        self.state.put('settings', account.name, {
+            'leverage': account.leverage,
+            'risk_percentage': account.risk_percentage,
+        })
+    
+    def _select_accounts(self, args: List[str]) -> List[TradingAccount]:
+        """Accounts named in command args, or all accounts when none is given"""
+        if not args:
+            return list(self.accounts.values())
+        if args[0] not in self.accounts:
+            raise KeyError(args[0])
+        return [self.accounts[args[0]]]
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
@@ -34,11 +140,12 @@ class TelegramBot:
             "🤖 Bybit Trading Bot Started!\n\n"
             "Available Commands:\n"
             "/start - Start the bot\n"
-            "/setleverage <number> - Set leverage\n"
-            "/setrisk <percentage> - Set risk percentage\n"
+            "/setleverage <number> [account] - Set leverage\n"
+            "/setrisk <percentage> [account] - Set risk percentage\n"
             "/status - Check bot status\n"
             "/balance - Check account balance\n"
             "/positions - View open positions\n"
+            "/latency - Show hot path latency\n"
             "/startsignal - Start signal scanning"
         )
         
@@ -75,17 +182,22 @@ class TelegramBot:
                 await update.message.reply_text("⚠️ Leverage must be between 1 and 100.")
                 return
             
-            # Set leverage for all pairs
-            for symbol in config.TRADE_PAIRS:
-                success = self.bybit_client.set_leverage(symbol, leverage)
-                if success:
-                    logger.info(f"Leverage set to {leverage} for {symbol}")
+            # Set leverage for all pairs of the selected accounts
+            for account in self._select_accounts(context.args[1:]):
+                for symbol in account.pairs:
+                    success = account.client.set_leverage(symbol, leverage)
+                    if success:
+                        logger.info("Leverage set to %s for %s (%s)", leverage, symbol, account.name,
+                                    extra={'symbol': symbol, 'account': account.name})
+                account.leverage = leverage
+                self._save_account_settings(account)
             
-            config.DEFAULT_LEVERAGE = leverage
             await update.message.reply_text(f"✅ Leverage set to {leverage}x for all pairs.")
             
+        except KeyError as e:
+            await update.message.reply_text(f"⚠️ Unknown account: {e.args[0]}")
         except (IndexError, ValueError):
-            await update.message.reply_text("⚠️ Usage: /setleverage <number>")
+            await update.message.reply_text("⚠️ Usage: /setleverage <number> [account]")
     
     async def set_risk_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /setrisk command"""
@@ -99,11 +211,15 @@ class TelegramBot:
                 await update.message.reply_text("⚠️ Risk percentage must be between 0.1 and 10.")
                 return
             
-            config.RISK_PERCENTAGE = risk_percent
+            for account in self._select_accounts(context.args[1:]):
+                account.risk_percentage = risk_percent
+                self._save_account_settings(account)
             await update.message.reply_text(f"✅ Risk percentage set to {risk_percent}%.")
             
+        except KeyError as e:
+            await update.message.reply_text(f"⚠️ Unknown account: {e.args[0]}")
         except (IndexError, ValueError):
-            await update.message.reply_text("⚠️ Usage: /setrisk <percentage>")
+            await update.message.reply_text("⚠️ Usage: /setrisk <percentage> [account]")
     
     async def check_balance_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /balance command"""
@@ -111,8 +227,15 @@ class TelegramBot:
             await update.message.reply_text("⛔ Unauthorized access.")
             return
         
-        balance = self.bybit_client.get_account_balance()
-        await update.message.reply_text(f"💰 Account Balance: ${balance:,.2f}")
+        if len(self.accounts) == 1:
+            balance = self.bybit_client.get_account_balance()
+            await update.message.reply_text(f"💰 Account Balance: ${balance:,.2f}")
+            return
+        
+        balance_text = "💰 Account Balances:\n\n"
+        for account in self.accounts.values():
+            balance_text += f"{account.name}: ${account.client.get_account_balance():,.2f}\n"
+        await update.message.reply_text(balance_text)
     
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /status command"""
@@ -120,16 +243,31 @@ class TelegramBot:
             await update.message.reply_text("⛔ Unauthorized access.")
             return
         
-        status_msg = (
-            "🤖 Bot Status\n\n"
-            f"Active Pairs: {', '.join(config.TRADE_PAIRS)}\n"
-            f"Leverage: {config.DEFAULT_LEVERAGE}x\n"
-            f"Risk per Trade: {config.RISK_PERCENTAGE}%\n"
-            f"Scan Interval: {config.SCAN_INTERVAL}s\n"
+        status_msg = "🤖 Bot Status\n\n"
+        for account in self.accounts.values():
+            if len(self.accounts) > 1:
+                status_msg += f"[{account.name}]\n"
+            status_msg += (
+                f"Mode: {'📝 Paper' if account.is_paper else '💸 Live'}\n"
+                f"Active Pairs: {', '.join(account.pairs)}\n"
+                f"Leverage: {account.leverage}x\n"
+                f"Risk per Trade: {account.risk_percentage}%\n"
+            )
+            risk = account.risk.summary()
+            status_msg += (
+                f"Exposure: {risk['positions']} positions, ${risk['gross_notional']:,.0f} gross, "
+                f"${risk['correlated_notional']:,.0f} correlated\n"
+            )
+        if self.universe is not None:
+            status_msg += f"Universe: {len(self.universe.symbols)}/{self.universe.size} pairs by ticker ranking\n"
+        status_msg += (
+            f"Scan Interval: {self.scheduler.tick_interval:g}s\n"
+            f"{self.scheduler.format_summary()}\n"
             f"Min Confidence: {config.MIN_CONFIDENCE*100}%\n"
             f"Signal Scanning: {'✅ Active' if self.is_scanning else '❌ Inactive'}\n"
             f"Last Signals: {len(self.last_signals)}\n"
-            f"Pending Signals: {len(self.pending_signals)}"
+            f"Pending Signals: {len(self.pending_signals)}/{self.pending_signals.max_size} "
+            f"(expired {self.pending_signals.expirations}, evicted {self.pending_signals.evictions})"
         )
         await update.message.reply_text(status_msg)
     
@@ -139,25 +277,43 @@ class TelegramBot:
             await update.message.reply_text("⛔ Unauthorized access.")
             return
         
-        positions = self.bybit_client.get_open_positions()
-        if not positions:
-            await update.message.reply_text("📭 No open positions.")
-            return
-        
         position_text = "📊 Open Positions:\n\n"
-        for pos in positions:
-            if float(pos.get('size', 0)) > 0:
+        has_positions = False
+        for account in self.accounts.values():
+            for pos in account.client.get_open_positions() or []:
+                if float(pos.get('size', 0)) <= 0:
+                    continue
+                has_positions = True
+                if len(self.accounts) > 1:
+                    position_text += f"Account: {account.name}\n"
                 position_text += (
                     f"Symbol: {pos.get('symbol', 'N/A')}\n"
                     f"Side: {pos.get('side', 'N/A')}\n"
                     f"Size: {pos.get('size', '0')}\n"
                     f"Entry: ${pos.get('entryPrice', '0')}\n"
                     f"P&L: ${pos.get('unrealisedPnl', '0')}\n"
-                    "─" * 20 + "\n"
+                    + "─" * 20 + "\n"
                 )
         
+        if not has_positions:
+            await update.message.reply_text("📭 No open positions.")
+            return
+        
         await update.message.reply_text(position_text)
     
+    async def latency_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /latency command"""
+        if str(update.effective_chat.id) != config.ADMIN_CHAT_ID:
+            await update.message.reply_text("⛔ Unauthorized access.")
+            return
+        
+        outbox = self.outbox.stats()
+        await update.message.reply_text(
+            f"⏱ Latency\n\n{self.metrics.format_summary()}\n\n"
+            f"Outbox: {outbox['queued']} queued, {outbox['sent']} sent, "
+            f"{outbox['dropped']} dropped, {outbox['flood_waits']} flood waits"
+        )
+    
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button callbacks for trade confirmation"""
         query = update.callback_query
@@ -170,58 +326,100 @@ class TelegramBot:
             await query.edit_message_text("⛔ Unauthorized access.")
             return
         
-        if data in self.pending_signals:
-            signal_data = self.pending_signals[data]
-            
-            if data.startswith('confirm_'):
-                # Execute trade
-                await self.execute_trade(signal_data, query)
-            elif data.startswith('cancel_'):
-                # Cancel trade
-                await query.edit_message_text(
-                    f"❌ Trade canceled for {signal_data['symbol']}\n"
-                    f"Signal: {signal_data['signal']}\n"
-                    f"Price: ${signal_data['current_price']}"
-                )
-            
-            # Remove from pending signals
-            del self.pending_signals[data]
+        action, _, alert_id = data.partition('_')
+        message_id = query.message.message_id
+        
+        # Pop before acting so a double press cannot execute twice
+        signal_data = self.pending_signals.pop(alert_id)
+        self.state.delete('pending', alert_id)
+        
+        # In a digest the other alerts keep the message; reply with a new one instead
+        remaining = self._alerts_in_message(message_id)
+        reply = OutboxReply(self.outbox, None if remaining else message_id)
+        
+        if signal_data is None:
+            await reply.edit_message_text("⌛ This signal has expired.")
+        elif action == 'confirm':
+            # Execute trade
+            await self.execute_trade(signal_data, reply)
+        elif action == 'cancel':
+            # Cancel trade
+            await reply.edit_message_text(
+                f"❌ Trade canceled for {signal_data['symbol']}\n"
+                f"Signal: {signal_data['signal']}\n"
+                f"Price: ${signal_data['current_price']}"
+            )
+        
+        if remaining:
+            text, reply_markup = self._render_alerts(remaining)
+            self.outbox.send(text, reply_markup, PRIORITY_UPDATE, message_id)
+    
+    def add_trade_listener(self, callback: Callable[[Dict, TradingAccount, Dict], None]):
+        """Call callback(signal_data, account, order_result) after every order that was placed"""
+        self._trade_listeners.append(callback)
     
     async def execute_trade(self, signal_data: Dict, query):
         """Execute confirmed trade"""
+        with self.metrics.measure('execute_trade'):
+            await self._execute_trade(signal_data, query)
+    
+    async def _execute_trade(self, signal_data: Dict, query):
         try:
             symbol = signal_data['symbol']
             signal = signal_data['signal']
             current_price = signal_data['current_price']
+            account = self.accounts[signal_data['account']]
             
             # Calculate position size
-            balance = self.bybit_client.get_account_balance()
-            risk_amount = balance * (config.RISK_PERCENTAGE / 100)
+            balance = account.client.get_account_balance()
+            risk_amount = balance * (account.risk_percentage / 100)
             
             # Calculate quantity with leverage
-            position_value = risk_amount * config.DEFAULT_LEVERAGE
+            position_value = risk_amount * account.leverage
             quantity = position_value / current_price
             
+            # Pre-trade portfolio risk check against cached exposure
+            side = 'Buy' if signal == 'BUY' else 'Sell'
+            held = account.risk.positions.get(symbol)
+            if held and (held[0] > 0) == (side == 'Buy') and not config.ALLOW_SCALE_IN:
+                logger.info("Skipping %s %s: position already open", symbol, side,
+                            extra={'symbol': symbol, 'account': account.name})
+                await query.edit_message_text(
+                    f"ℹ️ {symbol} already has an open {'long' if held[0] > 0 else 'short'} position; not adding to it"
+                )
+                return
+            with self.metrics.measure('risk_check'):
+                rejection = account.risk.check(symbol, side, quantity, current_price)
+            if rejection:
+                logger.warning("Trade blocked by risk limits: %s", rejection,
+                               extra={'symbol': symbol, 'account': account.name})
+                await query.edit_message_text(f"🛑 {symbol} trade blocked by risk limits:\n{rejection}")
+                return
+            
             # Calculate stop loss and take profit
             if signal == 'BUY':
-                stop_loss = current_price * (1 - config.STOP_LOSS_PERCENT / 100)
-                take_profit = current_price * (1 + config.TAKE_PROFIT_PERCENT / 100)
+                stop_loss = current_price * (1 - account.stop_loss_percent / 100)
+                take_profit = current_price * (1 + account.take_profit_percent / 100)
                 side = 'Buy'
             else:  # SELL
-                stop_loss = current_price * (1 + config.STOP_LOSS_PERCENT / 100)
-                take_profit = current_price * (1 - config.TAKE_PROFIT_PERCENT / 100)
+                stop_loss = current_price * (1 + account.stop_loss_percent / 100)
+                take_profit = current_price * (1 - account.take_profit_percent / 100)
                 side = 'Sell'
             
             # Place order
-            order_result = self.bybit_client.place_order(
-                symbol=symbol,
-                side=side,
-                qty=quantity,
-                stop_loss=stop_loss,
-                take_profit=take_profit
-            )
+            with self.metrics.measure('place_order'):
+                order_result = account.client.place_order(
+                    symbol=symbol,
+                    side=side,
+                    qty=quantity,
+                    stop_loss=stop_loss,
+                    take_profit=take_profit
+                )
             
             if order_result:
+                account.risk.on_fill(symbol, side, quantity, current_price)
+                for callback in self._trade_listeners:
+                    callback(signal_data, account, order_result)
                 await query.edit_message_text(
                     f"✅ Trade Executed!\n\n"
                     f"Symbol: {symbol}\n"
@@ -234,50 +432,58 @@ class TelegramBot:
                 )
                 
                 # Log the trade
-                logger.info(f"Trade executed: {symbol} {side} {quantity} @ {current_price}")
+                logger.info("Trade executed: %s %s %s @ %s", symbol, side, quantity, current_price,
+                            extra={'symbol': symbol, 'account': account.name})
             else:
                 await query.edit_message_text(
                     f"❌ Trade execution failed for {symbol}"
                 )
                 
         except Exception as e:
-            logger.error(f"Trade execution failed: {e}")
+            logger.error("Trade execution failed: %s", e, extra={'symbol': signal_data.get('symbol')})
             await query.edit_message_text("❌ Trade execution failed due to an error.")
     
     async def scan_pair(self, symbol: str):
         """Scan a single pair for trading signals"""
         try:
             # Get market data
-            market_data = self.bybit_client.get_market_data(symbol, '15', 100)
+            with self.metrics.measure('fetch_klines'):
+                market_data = self.market_data.get_market_data(symbol, '15', 100)
             if not market_data or 'list' not in market_data:
                 return None
             
-            # Extract closing prices
-            prices = [float(candle[4]) for candle in market_data['list']]  # Close prices
+            for account in self.accounts.values():
+                account.on_market_data(symbol, market_data)
+            
+            # Bybit returns newest first; strategies, the model and sizing expect oldest first
+            prices = [float(candle[4]) for candle in reversed(market_data['list'])]  # Close prices
             current_price = prices[-1] if prices else 0
+            microstructure = self.microstructure.features(symbol)
+            
+            # Nothing to do if the candles are the same as at the last evaluation
+            if not self.scheduler.record(symbol, kline_fingerprint(market_data['list']), prices,
+                                         volatile=microstructure is not None):
+                return None
+            self.correlation.update(symbol, prices)
             
             # Analyze with strategies
-            strategy_results = TradingStrategies.analyze_all_strategies(prices)
+            with self.metrics.measure('analyze'):
+                strategy_results = self.market_data.analyze(symbol, market_data, prices, microstructure)
             final_signal = strategy_results['final_signal']
             
             if final_signal == 'HOLD':
                 return None
             
             # Calculate ML confidence
-            ml_confidence = self.ml_model.calculate_confidence(
-                prices, final_signal, strategy_results
-            )
+            with self.metrics.measure('ml_confidence'):
+                ml_confidence = self.ml_model.calculate_confidence(
+                    prices, final_signal, strategy_results
+                )
             
             # Check minimum confidence
             if ml_confidence < config.MIN_CONFIDENCE:
                 return None
             
-            # Check for duplicate signal
-            signal_key = f"{symbol}_{final_signal}"
-            if (signal_key in self.last_signals and 
-                (time.time() - self.last_signals[signal_key]) < 300):  # 5 minutes
-                return None
-            
             return {
                 'symbol': symbol,
                 'signal': final_signal,
@@ -287,92 +493,293 @@ class TelegramBot:
             }
             
         except Exception as e:
-            logger.error(f"Error scanning {symbol}: {e}")
+            logger.error("Error scanning %s: %s", symbol, e, extra={'symbol': symbol})
             return None
     
     async def start_scanning(self):
         """Start continuous scanning of all pairs"""
         logger.info("Starting multi-pair scanning...")
         self.is_scanning = True
+        self.state.put('runtime', 'scanning', True)
+        cancelled = False
         
         while self.is_scanning:
             try:
-                for symbol in config.TRADE_PAIRS:
+                await self.update_universe()
+                sweep_start = time.perf_counter()
+                symbols = self.scan_symbols()
+                due = self.scheduler.due(symbols, self.current_prices(symbols))
+                for symbol, _ in due:
                     try:
-                        signal = await self.scan_pair(symbol)
+                        with self.metrics.measure('scan_pair'):
+                            signal = await self.scan_pair(symbol)
+                        
+                        if not signal:
+                            continue
                         
-                        if signal:
+                        # Fan the shared signal out to every account trading this pair
+                        for account in self.accounts.values():
+                            if symbol not in account.pairs:
+                                continue
+                            
+                            # Check for duplicate signal within the dedupe window
+                            signal_key = f"{account.name}:{symbol}_{signal['signal']}"
+                            if signal_key in self.last_signals:
+                                continue
+                            
                             # Store in last signals
-                            signal_key = f"{signal['symbol']}_{signal['signal']}"
-                            self.last_signals[signal_key] = time.time()
+                            self.last_signals.set(signal_key, self.clock.time())
+                            self.state.put('dedupe', signal_key, self.clock.time(),
+                                           self.last_signals.expires_at(signal_key))
                             
                             # Send signal to Telegram
-                            await self.send_signal_alert(signal)
+                            with self.metrics.measure('send_signal_alert'):
+                                await self.send_signal_alert(dict(signal, account=account.name))
                     except Exception as e:
-                        logger.error(f"Error scanning {symbol}: {e}")
+                        logger.error("Error scanning %s: %s", symbol, e, extra={'symbol': symbol})
                         continue
+                if due:
+                    self.metrics.record('scan_sweep', time.perf_counter() - sweep_start)
+                
+                # Risk state is refreshed between sweeps, keeping pre-trade checks cheap
+                try:
+                    self.correlation.refresh()
+                    for account in self.accounts.values():
+                        if account.risk.sync_due():
+                            account.sync_risk()
+                except Exception as e:
+                    logger.error("Risk refresh failed: %s", e)
+                
+                await self.expire_pending_signals()
+                for signal_key, _ in self.last_signals.expire():
+                    self.state.delete('dedupe', signal_key)
                 
                 # Wait for next scan
-                await asyncio.sleep(config.SCAN_INTERVAL)
+                await self.clock.sleep(self.scheduler.tick_interval)
                 
             except asyncio.CancelledError:
+                # Shutdown: keep the persisted flag so scanning resumes after restart
                 logger.info("Signal scanning cancelled")
+                cancelled = True
                 break
             except Exception as e:
-                logger.error(f"Scanning error: {e}")
-                await asyncio.sleep(config.SCAN_INTERVAL)
+                logger.error("Scanning error: %s", e)
+                await self.clock.sleep(config.SCAN_INTERVAL)
         
         self.is_scanning = False
+        if not cancelled:
+            self.state.put('runtime', 'scanning', False)
+    
+    async def update_universe(self):
+        """Refresh the dynamic universe, creating or freeing per-symbol state"""
+        if self.universe is None or not self.universe.refresh_due():
+            return
+        
+        before = set(self.scan_symbols())
+        # Never drop a symbol an account still holds
+        held = {symbol for account in self.accounts.values() for symbol in account.risk.positions}
+        added, removed = self.universe.refresh(keep=held)
+        if not added and not removed:
+            return
+        
+        self.market_data.symbols = list(self.universe.symbols)
+        after = set(self.scan_symbols())
+        dropped = [symbol for symbol in before if symbol not in after]
+        for symbol in dropped:
+            self.market_data.forget(symbol)
+            self.correlation.forget(symbol)
+            self.microstructure.forget(symbol)
+            self.scheduler.forget(symbol)
+        
+        if self.public_stream is not None:
+            await self.public_stream.subscribe([symbol for symbol in after if symbol not in before])
+            await self.public_stream.unsubscribe(dropped)
+    
+    def current_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """Latest prices for intra-candle triggers: order-book mids, else one bulk tickers call"""
+        symbols = list(symbols)
+        if not self.scheduler.needs_prices(symbols):
+            return {}
+        
+        prices = {}
+        for symbol in symbols:
+            mid = self.microstructure.mid(symbol)
+            if mid:
+                prices[symbol] = mid
+        if len(prices) == len(symbols):
+            return prices
+        
+        try:
+            with self.metrics.measure('fetch_tickers'):
+                tickers = self.market_data.client.get_tickers() or []
+        except Exception as e:
+            logger.warning("Ticker fetch for scan scheduling failed: %s", e)
+            return prices
+        wanted = set(symbols)
+        for ticker in tickers:
+            symbol = ticker.get('symbol')
+            if symbol in wanted and symbol not in prices:
+                try:
+                    prices[symbol] = float(ticker['lastPrice'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return prices
+    
+    def scan_symbols(self) -> List[str]:
+        """Union of all accounts' pairs, each symbol scanned once per sweep"""
+        symbols = {}
+        for account in self.accounts.values():
+            for symbol in account.pairs:
+                symbols[symbol] = None
+        return list(symbols)
     
     async def send_signal_alert(self, signal: Dict):
-        """Send signal alert to Telegram with confirmation buttons"""
+        """Queue a signal alert; alerts found in the same sweep are sent as one digest"""
         try:
-            symbol = signal['symbol']
-            current_price = signal['current_price']
-            confidence = signal['confidence']
-            
             # Create unique callback data
-            timestamp = int(time.time())
-            callback_id = f"confirm_{symbol}_{timestamp}"
-            cancel_id = f"cancel_{symbol}_{timestamp}"
+            signal.setdefault('account', next(iter(self.accounts)))
+            alert_id = f"{next(self._alert_ids):x}"
             
             # Store signal data
-            self.pending_signals[callback_id] = signal
-            self.pending_signals[cancel_id] = signal
+            evicted = self.pending_signals.set(alert_id, signal)
+            self.state.put('pending', alert_id, signal, self.pending_signals.expires_at(alert_id))
             
-            # Create keyboard
-            keyboard = [
-                [
-                    InlineKeyboardButton("✅ YES - Execute", callback_data=callback_id),
-                    InlineKeyboardButton("❌ NO - Cancel", callback_data=cancel_id)
-                ]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            if self.application:
+                self.outbox.submit_alert(alert_id, signal)
             
-            # Send message
+            for old_alert_id, _ in evicted:
+                self.state.delete('pending', old_alert_id)
+            self._mark_signals_expired([old_signal for _, old_signal in evicted])
+        except Exception as e:
+            logger.error("Failed to send signal alert: %s", e, extra={'symbol': signal.get('symbol')})
+    
+    def _render_alerts(self, alerts: List[Tuple[str, Dict]]):
+        """Message text and keyboard for one alert or a digest of several"""
+        if len(alerts) == 1:
+            alert_id, signal = alerts[0]
+            account_line = f"Account: {signal['account']}\n" if len(self.accounts) > 1 else ""
             message_text = (
                 f"🚨 Trading Signal Detected!\n\n"
-                f"Symbol: {symbol}\n"
+                f"{account_line}"
+                f"Symbol: {signal['symbol']}\n"
                 f"Signal: {signal['signal']}\n"
-                f"Current Price: ${current_price:.2f}\n"
-                f"Confidence: {confidence:.1%}\n\n"
+                f"Current Price: ${signal['current_price']:.2f}\n"
+                f"Confidence: {signal['confidence']:.1%}\n\n"
                 f"Execute trade?"
             )
-            
-            if self.application:
-                await self.application.bot.send_message(
-                    chat_id=config.ADMIN_CHAT_ID,
-                    text=message_text,
-                    reply_markup=reply_markup
+            keyboard = [
+                [
+                    InlineKeyboardButton("✅ YES - Execute", callback_data=f"confirm_{alert_id}"),
+                    InlineKeyboardButton("❌ NO - Cancel", callback_data=f"cancel_{alert_id}")
+                ]
+            ]
+            return message_text, InlineKeyboardMarkup(keyboard)
+        
+        message_text = f"🚨 {len(alerts)} Trading Signals Detected!\n\n"
+        keyboard = []
+        for alert_id, signal in alerts:
+            account = f" [{signal['account']}]" if len(self.accounts) > 1 else ""
+            message_text += (
+                f"{signal['symbol']}{account}: {signal['signal']} @ ${signal['current_price']:.2f} "
+                f"({signal['confidence']:.1%})\n"
+            )
+            keyboard.append([
+                InlineKeyboardButton(f"✅ {signal['symbol']} {signal['signal']}", callback_data=f"confirm_{alert_id}"),
+                InlineKeyboardButton(f"❌ {signal['symbol']}", callback_data=f"cancel_{alert_id}")
+            ])
+        message_text += "\nExecute trades?"
+        return message_text, InlineKeyboardMarkup(keyboard)
+    
+    async def _deliver_alert_batch(self, alerts: List[Tuple[str, Dict]]):
+        """Send queued alerts that are still pending as a single message"""
+        alerts = [(alert_id, signal) for alert_id, signal in alerts if alert_id in self.pending_signals]
+        if not alerts:
+            return
+        
+        message_text, reply_markup = self._render_alerts(alerts)
+        message = await self.outbox.call(
+            'send_message',
+            chat_id=config.ADMIN_CHAT_ID,
+            text=message_text,
+            reply_markup=reply_markup
+        )
+        if message is None:
+            return
+        
+        for alert_id, signal in alerts:
+            signal['message_id'] = message.message_id
+            self.state.put('pending', alert_id, signal, self.pending_signals.expires_at(alert_id))
+    
+    def _alerts_in_message(self, message_id) -> List[Tuple[str, Dict]]:
+        """Pending alerts shown in a given Telegram message"""
+        return [
+            (alert_id, signal) for alert_id, signal in self.pending_signals.items()
+            if signal.get('message_id') == message_id
+        ]
+    
+    async def expire_pending_signals(self):
+        """Drop pending signals past their TTL and mark their alerts as expired"""
+        expired = self.pending_signals.expire()
+        for alert_id, _ in expired:
+            self.state.delete('pending', alert_id)
+        self._mark_signals_expired([signal for _, signal in expired])
+    
+    def _mark_signals_expired(self, signals: List[Dict]):
+        if not self.application:
+            return
+        
+        by_message: Dict[int, List[Dict]] = {}
+        for signal in signals:
+            if 'message_id' in signal:
+                by_message.setdefault(signal['message_id'], []).append(signal)
+        
+        for message_id, expired in by_message.items():
+            # A digest keeps its other alerts; only the last ones out mark the message expired
+            remaining = self._alerts_in_message(message_id)
+            reply_markup = None
+            if remaining:
+                message_text, reply_markup = self._render_alerts(remaining)
+            elif len(expired) == 1:
+                signal = expired[0]
+                message_text = (
+                    f"⌛ Signal expired for {signal['symbol']}\n"
+                    f"Signal: {signal['signal']}\n"
+                    f"Price: ${signal['current_price']}"
                 )
-        except Exception as e:
-            logger.error(f"Failed to send signal alert: {e}")
+            else:
+                message_text = "⌛ Signals expired:\n" + "\n".join(
+                    f"{signal['symbol']} {signal['signal']} @ ${signal['current_price']}" for signal in expired
+                )
+            self.outbox.send(message_text, reply_markup, PRIORITY_UPDATE, message_id)
+    
+    async def _post_init(self, application: Application):
+        """Start the public stream and resume scanning that was active before a restart"""
+        if config.MICROSTRUCTURE_STREAM:
+            self.public_stream = BybitPublicStream(self.microstructure, self.scan_symbols(),
+                                                   record_path=config.MICROSTRUCTURE_RECORD_PATH or None)
+            self._stream_task = asyncio.create_task(self.public_stream.run())
+        if self.resume_scanning and not self.is_scanning:
+            asyncio.create_task(self.start_scanning())
+            self.is_scanning = True
+            logger.info("Signal scanning resumed from saved state")
+    
+    async def _post_shutdown(self, application: Application):
+        if self._stream_task is not None:
+            self._stream_task.cancel()
+        await self.outbox.close()
+        self.state.close()
     
     async def run(self):
         """Start the Telegram bot - SIMPLIFIED VERSION"""
         try:
             # Create application
-            self.application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+            self.application = (
+                Application.builder()
+                .token(config.TELEGRAM_BOT_TOKEN)
+                .post_init(self._post_init)
+                .post_shutdown(self._post_shutdown)
+                .build()
+            )
             
             # Add command handlers
             self.application.add_handler(CommandHandler("start", self.start_command))
@@ -382,6 +789,7 @@ class TelegramBot:
             self.application.add_handler(CommandHandler("balance", self.check_balance_command))
             self.application.add_handler(CommandHandler("status", self.status_command))
             self.application.add_handler(CommandHandler("positions", self.positions_command))
+            self.application.add_handler(CommandHandler("latency", self.latency_command))
             
             # Add callback handler for buttons
             self.application.add_handler(CallbackQueryHandler(self.button_callback))
@@ -394,7 +802,7 @@ class TelegramBot:
             await self.application.run_polling()
             
         except Exception as e:
-            logger.error(f"Telegram bot failed to start: {e}")
+            logger.error("Telegram bot failed to start: %s", e)
             raise
 
 # For direct execution testing
@@ -406,10 +814,8 @@ if __name__ == "__main__":
     load_dotenv()
     
     # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    from logging_setup import setup_logging
+    setup_logging()
     
     # Create and run bot
     bot = TelegramBot()
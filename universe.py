@@ -0,0 +1,113 @@
+import logging
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config import config
+from clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+
+class UniverseSelector:
+    """Picks the symbols worth scanning from one bulk /v5/market/tickers call.
+
+    USDT perpetuals above `min_turnover` are ranked by 24h turnover, 24h range
+    (volatility) and top-of-book spread; the best `size` are active. Incumbents
+    keep their slot while they rank within `size + buffer`, so the set does not
+    churn on small rank changes.
+    """
+
+    def __init__(self, client, size: Optional[int] = None, min_turnover: Optional[float] = None,
+                 refresh_interval: Optional[float] = None, buffer: Optional[int] = None,
+                 weights: Tuple[float, float, float] = (0.5, 0.3, 0.2), clock=None):
+        self.client = client
+        self.size = config.UNIVERSE_SIZE if size is None else size
+        self.min_turnover = config.UNIVERSE_MIN_TURNOVER if min_turnover is None else min_turnover
+        self.refresh_interval = config.UNIVERSE_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.buffer = max(self.size // 4, 1) if buffer is None else buffer
+        self.weights = weights
+        self.clock = clock or SystemClock()
+        self.symbols: List[str] = []
+        self.scores: Dict[str, float] = {}
+        self.last_refresh: Optional[float] = None
+
+    def refresh_due(self) -> bool:
+        return self.last_refresh is None or self.clock.time() - self.last_refresh >= self.refresh_interval
+
+    @staticmethod
+    def _metrics(ticker: Dict) -> Optional[Tuple[float, float, float]]:
+        try:
+            last = float(ticker['lastPrice'])
+            turnover = float(ticker.get('turnover24h') or 0)
+            high = float(ticker.get('highPrice24h') or last)
+            low = float(ticker.get('lowPrice24h') or last)
+            bid = float(ticker.get('bid1Price') or 0)
+            ask = float(ticker.get('ask1Price') or 0)
+        except (KeyError, TypeError, ValueError):
+            return None
+        if last <= 0:
+            return None
+        spread = (ask - bid) / ((ask + bid) / 2) if bid > 0 and ask > bid else float('inf')
+        return turnover, (high - low) / last, spread
+
+    def rank(self, tickers: Iterable[Dict]) -> List[Tuple[str, float]]:
+        """(symbol, score) best first; score is a weighted average of percentile ranks"""
+        rows = []
+        for ticker in tickers:
+            symbol = ticker.get('symbol', '')
+            if not symbol.endswith('USDT'):
+                continue
+            metrics = self._metrics(ticker)
+            if metrics is None or metrics[0] < self.min_turnover:
+                continue
+            rows.append((symbol, metrics))
+        if not rows:
+            return []
+
+        n = len(rows)
+        scores = {symbol: 0.0 for symbol, _ in rows}
+        # Higher turnover and volatility are better, a tighter spread is better
+        for column, (weight, descending) in enumerate(zip(self.weights, (True, True, False))):
+            ordered = sorted(rows, key=lambda row: row[1][column], reverse=descending)
+            for position, (symbol, _) in enumerate(ordered):
+                scores[symbol] += weight * (1 - position / n)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def select(self, tickers: Iterable[Dict], keep: Iterable[str] = ()) -> Tuple[List[str], List[str]]:
+        """Update the active set from tickers; returns (added, removed).
+
+        Symbols in `keep` (e.g. with open positions) are never removed.
+        """
+        ranked = self.rank(tickers)
+        self.scores = dict(ranked)
+        positions = {symbol: i for i, (symbol, _) in enumerate(ranked)}
+        current = set(self.symbols)
+        keep = set(keep)
+
+        retained = [s for s in self.symbols
+                    if s in keep or positions.get(s, math.inf) < self.size + self.buffer]
+        selected: Set[str] = set(retained)
+        for symbol, _ in ranked:
+            if len(selected) >= max(self.size, len(retained)):
+                break
+            selected.add(symbol)
+
+        added = [s for s, _ in ranked if s in selected and s not in current]
+        removed = [s for s in self.symbols if s not in selected]
+        self.symbols = sorted(selected, key=lambda s: positions.get(s, math.inf))
+        return added, removed
+
+    def refresh(self, keep: Iterable[str] = ()) -> Tuple[List[str], List[str]]:
+        """Fetch all tickers in one call and update the active set"""
+        self.last_refresh = self.clock.time()
+        tickers = self.client.get_tickers()
+        if not tickers:
+            logger.warning("Universe refresh skipped: no tickers")
+            return [], []
+
+        added, removed = self.select(tickers, keep)
+        if added or removed:
+            logger.info("🌐 Universe updated: +%s -%s (%d active)",
+                        ','.join(added) or '-', ','.join(removed) or '-', len(self.symbols))
+        return added, removed